@@ -1,60 +1,528 @@
 # ai_itinerary.py
 
-import cohere
+import asyncio
+import contextvars
+import datetime
 import os
+import re
+from contextlib import contextmanager
+
+import eventloop
+from cache import DiskCache, make_key
+from itinerary import Day, Itinerary, day_markdown, parse_day, parse_itinerary
+from prompts import (DAY_JSON_TEMPLATE, DAY_TEMPLATE, ITINERARY_TEMPLATE, OUTLINE_TEMPLATE, STRUCTURED_TEMPLATE,
+                     Prompt, estimate_tokens, record_usage, trip_payload)
+from ratelimit import BackgroundLimiter, RateLimiter, RateLimitTimeout, call_with_retry_async, status_code
+from singleflight import SingleFlight
+from startup import lazy_import
 
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+DEFAULT_MODEL = "command-r-plus"
+
+ITINERARY_CACHE_TTL = int(os.getenv("ITINERARY_CACHE_TTL", 24 * 3600))
+ITINERARY_CACHE_MAX_ENTRIES = int(os.getenv("ITINERARY_CACHE_MAX_ENTRIES", 500))
+# Second tier: reuse an itinerary for the same trip on other dates in the same season, with the dates rewritten
+ITINERARY_SHIFT_REUSE = os.getenv("ITINERARY_SHIFT_REUSE", "1").lower() in ("1", "true", "yes")
+ITINERARY_CACHE_BYPASS = os.getenv("ITINERARY_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+# How long a caller waits on an identical in-flight generation before giving up
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("ITINERARY_SINGLE_FLIGHT_TIMEOUT", 90))
+ITINERARY_STREAMING = os.getenv("ITINERARY_STREAMING", "1").lower() in ("1", "true", "yes")
+# "json" asks the model for a structured itinerary (see itinerary.py) instead of free-form markdown
+ITINERARY_FORMAT = os.getenv("ITINERARY_FORMAT", "markdown").lower()
+STRUCTURED = ITINERARY_FORMAT == "json"
+
+# Process-wide budget for Cohere calls; bursts queue for up to COHERE_MAX_QUEUE_WAIT seconds
+COHERE_RPM = int(os.getenv("COHERE_RPM", 20))
+COHERE_TPM = int(os.getenv("COHERE_TPM", 0))
+COHERE_MAX_RETRIES = int(os.getenv("COHERE_MAX_RETRIES", 4))
+COHERE_MAX_QUEUE_WAIT = float(os.getenv("COHERE_MAX_QUEUE_WAIT", 20))
+COHERE_MAX_CONNECTIONS = int(os.getenv("COHERE_MAX_CONNECTIONS", 32))
+# Cache warm-up gets its own smaller budget and only uses the shared one when live callers leave room
+COHERE_BACKGROUND_RPM = int(os.getenv("COHERE_BACKGROUND_RPM", 4))
+MAX_OUTPUT_TOKENS = 1000
+
+# Trips this long or longer are generated as an outline plus one call per day, in parallel.
+# Below a week a single reply fits in MAX_OUTPUT_TOKENS, and one call costs a fraction of the rate budget.
+CHUNKED_MIN_DAYS = int(os.getenv("ITINERARY_CHUNKED_MIN_DAYS", 7))
+CHUNK_CONCURRENCY = int(os.getenv("ITINERARY_CHUNK_CONCURRENCY", 8))
+DAY_MAX_TOKENS = 250
+
+# Created on the shared event loop on first use; one connection pool serves every call in the process
+_client = None
+cohere_limiter = RateLimiter(COHERE_RPM, COHERE_TPM)
+background_limiter = BackgroundLimiter(cohere_limiter, COHERE_BACKGROUND_RPM, headroom=max(1, COHERE_RPM // 4))
+# Limiter for calls made from the current context; see background_budget()
+_limiter = contextvars.ContextVar("cohere_limiter", default=cohere_limiter)
+# Token totals for calls made from the current context; see count_usage()
+_usage_totals = contextvars.ContextVar("cohere_usage", default=None)
+
+# -------------------- ERRORS --------------------
+class ItineraryError(Exception):
+    """Cohere could not produce an itinerary"""
 
-co = cohere.Client(COHERE_API_KEY)
+class ItineraryRateLimited(ItineraryError):
+    """Rate limited by Cohere after retries, or the local limiter queue was full"""
+
+class ItineraryUnavailable(ItineraryError):
+    """Cohere failed or could not be reached after retries"""
+
+def _as_itinerary_error(e):
+    if isinstance(e, ItineraryError):
+        return e
+    if isinstance(e, RateLimitTimeout) or status_code(e) == 429:
+        return ItineraryRateLimited(str(e))
+    return ItineraryUnavailable(str(e))
+
+@contextmanager
+def background_budget():
+    """Cohere calls made inside this block run on the background budget.
+
+    The choice follows the calling context onto the event loop, including the
+    per-day calls of a chunked itinerary.
+    """
+    token = _limiter.set(background_limiter)
+    try:
+        yield
+    finally:
+        _limiter.reset(token)
+
+@contextmanager
+def count_usage():
+    """Yields the token totals of the Cohere calls made inside this block.
+
+    Like background_budget(), this includes the per-day calls of a chunked itinerary.
+    """
+    totals = {"input_tokens": 0, "output_tokens": 0}
+    token = _usage_totals.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_totals.reset(token)
+
+def get_client():
+    """Async Cohere client; only call this from coroutines running on eventloop's loop"""
+    global _client
+    if _client is None:
+        httpx = lazy_import("httpx")
+        pool = httpx.AsyncClient(limits=httpx.Limits(max_connections=COHERE_MAX_CONNECTIONS,
+                                                     max_keepalive_connections=COHERE_MAX_CONNECTIONS))
+        _client = lazy_import("cohere").AsyncClient(COHERE_API_KEY, httpx_client=pool)
+    return _client
 
 def generate_itinerary_prompt(data):
-    return f'''
-You are an expert travel assistant creating a professional, well-structured travel itinerary based on these details:
-**Origin:** {data['origin']}
-**Destination:** {data['destination']}
-**Trip Duration:** {data['trip_length']} days  
-**Dates:** {data['start_date']} to {data['end_date']}  
-**Budget Level:** {data['budget']}  
-**Preferred Transportation:** {data['transportation']}  
-**Traveler Interests:** {', '.join(data['activities']) if data['activities'] else 'General'}
-
-### Output Requirements:
-1. **Introduction:** Brief, engaging paragraph about the destination (50-60 words max)
-2. **Daily Structure:** Each day should follow this consistent format (100-120 words per day):
-   - **Day X: [Theme/Area]**
-   - Main attraction or activity with brief description
-   - One food recommendation (restaurant name or local specialty)
-   - Practical tip or cultural insight using `code` formatting naturally
-3. **Formatting Standards:**
-   - Use **bold** for day headers and key attractions
-   - Use `code` for practical tips, booking advice, or local insights
-   - Keep structure consistent across all days
-4. **Professional Guidelines:**
-   - Include realistic travel times between locations
-   - Mention advance booking requirements where relevant
-   - Suggest budget-appropriate options when possible
-   - For longer trips (4+ days), group similar activities or highlight key days
-   - Ensure geographical accuracy - only suggest day trips within reasonable distance
-
-### Quality Standards:
-- Write naturally and professionally
-- Avoid tourist clichés and generic descriptions
-- Include actionable, specific recommendations
-- Maintain consistent tone throughout
-- Focus on practical value for travelers
-
-Generate the complete itinerary following these guidelines exactly.
-'''
-
-def generate_with_cohere(prompt, model="command-r-plus"):
-    try:
-        response = co.chat(
-            model=model,
-            message=prompt,
-            temperature=0.7,
-            max_tokens=1000,
+    """Static instructions as the preamble, the trip as a compact message"""
+    if STRUCTURED:
+        return STRUCTURED_TEMPLATE.render(trip=trip_payload(data), days=data["trip_length"])
+    return ITINERARY_TEMPLATE.render(trip=trip_payload(data))
+
+def finalize_itinerary(text, data):
+    """In structured mode, store valid replies (one day per trip day) as canonical JSON; anything else as markdown"""
+    if not STRUCTURED:
+        return text
+    itinerary = parse_itinerary(text, int(data["trip_length"]))
+    return itinerary.to_json() if itinerary.structured else itinerary.markdown
+
+def _usage(response):
+    units = getattr(getattr(response, "meta", None), "billed_units", None)
+    return {
+        "input_tokens": int(getattr(units, "input_tokens", 0) or 0),
+        "output_tokens": int(getattr(units, "output_tokens", 0) or 0),
+    }
+
+def _chat_kwargs(prompt, model, max_tokens):
+    kwargs = {"model": model, "temperature": 0.7, "max_tokens": max_tokens}
+    if isinstance(prompt, Prompt):
+        kwargs.update(preamble=prompt.preamble, message=prompt.message)
+        if prompt.schema:
+            kwargs["response_format"] = {"type": "json_object", "schema": prompt.schema}
+    else:
+        kwargs["message"] = prompt
+    return kwargs
+
+def _estimate(prompt):
+    return prompt.estimated_tokens() if isinstance(prompt, Prompt) else estimate_tokens(prompt)
+
+async def chat_with_usage_async(prompt, model=DEFAULT_MODEL, max_tokens=MAX_OUTPUT_TOKENS):
+    """Rate-limited Cohere call returning (text, {"input_tokens", "output_tokens"}).
+
+    Retryable failures are retried with backoff; anything left raises an ItineraryError.
+    """
+    reserved = _estimate(prompt) + max_tokens
+    limiter = _limiter.get()
+    try:
+        response = await call_with_retry_async(
+            lambda: get_client().chat(**_chat_kwargs(prompt, model, max_tokens)),
+            limiter=limiter, tokens=reserved,
+            retries=COHERE_MAX_RETRIES, max_wait=COHERE_MAX_QUEUE_WAIT,
         )
-        return response.text
     except Exception as e:
-        return f"Error generating itinerary with Cohere: {str(e)}"
+        raise _as_itinerary_error(e) from e
+    usage = _usage(response)
+    if usage["input_tokens"] or usage["output_tokens"]:
+        limiter.settle(reserved, usage["input_tokens"] + usage["output_tokens"])
+    totals = _usage_totals.get()
+    if totals is not None:
+        # Only ever updated on the event loop thread
+        for name, value in usage.items():
+            totals[name] += value
+    record_usage(prompt, usage["input_tokens"], usage["output_tokens"] or estimate_tokens(response.text))
+    return response.text, usage
+
+def chat_with_usage(prompt, model=DEFAULT_MODEL, max_tokens=MAX_OUTPUT_TOKENS):
+    """Blocking wrapper: the call itself runs on the shared event loop"""
+    return eventloop.run(chat_with_usage_async(prompt, model, max_tokens))
+
+async def _chat_async(prompt, model=DEFAULT_MODEL, max_tokens=MAX_OUTPUT_TOKENS):
+    return (await chat_with_usage_async(prompt, model, max_tokens))[0]
+
+def _chat(prompt, model=DEFAULT_MODEL, max_tokens=MAX_OUTPUT_TOKENS):
+    return chat_with_usage(prompt, model, max_tokens)[0]
+
+async def generate_with_cohere_async(prompt, model=DEFAULT_MODEL):
+    """Itinerary text for prompt; raises ItineraryError on failure"""
+    return await _chat_async(prompt, model)
+
+def generate_with_cohere(prompt, model=DEFAULT_MODEL):
+    return eventloop.run(generate_with_cohere_async(prompt, model))
+
+async def _with_first(first, events):
+    if first is not None:
+        yield first
+    async for event in events:
+        yield event
+
+async def stream_with_cohere_async(prompt, model=DEFAULT_MODEL, max_tokens=MAX_OUTPUT_TOKENS):
+    """Yield text chunks from the chat-stream API as they are generated.
+
+    Only opening the stream is retried; a failure after text was yielded raises
+    an ItineraryError.
+    """
+    async def open_stream():
+        events = get_client().chat_stream(**_chat_kwargs(prompt, model, max_tokens)).__aiter__()
+        # Errors such as a 429 surface on the first event, so pull it inside the retry
+        return events, await anext(events, None)
+
+    try:
+        events, first = await call_with_retry_async(
+            open_stream, limiter=_limiter.get(), tokens=_estimate(prompt) + max_tokens,
+            retries=COHERE_MAX_RETRIES, max_wait=COHERE_MAX_QUEUE_WAIT,
+        )
+        usage = None
+        async for event in _with_first(first, events):
+            if event.event_type == "text-generation":
+                yield event.text
+            elif event.event_type == "stream-end":
+                usage = _usage(getattr(event, "response", None))
+        if usage is not None:
+            record_usage(prompt, usage["input_tokens"], usage["output_tokens"])
+    except Exception as e:
+        raise _as_itinerary_error(e) from e
+
+def stream_with_cohere(prompt, model=DEFAULT_MODEL, max_tokens=MAX_OUTPUT_TOKENS):
+    """Blocking iterator over stream_with_cohere_async"""
+    return eventloop.iterate(stream_with_cohere_async(prompt, model, max_tokens))
+
+# -------------------- CHUNKED GENERATION --------------------
+# Day calls run as tasks on the shared event loop, at most CHUNK_CONCURRENCY at a time
+_day_slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+_OUTLINE_DAY = re.compile(r"^[\s*#-]*Day\s+(\d+)\s*[:.\-\u2013\u2014]\s*(.+?)[\s*]*$", re.IGNORECASE)
+_OUTLINE_INTRO = re.compile(r"^[\s*#-]*Intro(?:duction)?\s*:\s*(.+?)[\s*]*$", re.IGNORECASE)
+
+def generate_outline_prompt(data):
+    return OUTLINE_TEMPLATE.render(trip=trip_payload(data), days=data['trip_length'])
+
+def generate_day_prompt(data, day, theme, outline):
+    plan = "\n".join(f"Day {n}: {t}" for n, t in outline)
+    template = DAY_JSON_TEMPLATE if STRUCTURED else DAY_TEMPLATE
+    return template.render(trip=trip_payload(data), plan=plan, day=day, theme=theme)
+
+def parse_outline(text, data):
+    """(intro, [(day, theme), ...]) from the outline reply, filling any missing days"""
+    intro = ""
+    themes = {}
+    for line in text.splitlines():
+        day = _OUTLINE_DAY.match(line)
+        if day:
+            themes.setdefault(int(day.group(1)), day.group(2).strip())
+            continue
+        match = _OUTLINE_INTRO.match(line)
+        if match and not intro:
+            intro = match.group(1).strip()
+    days = [(n, themes.get(n, f"Exploring {data['destination']}")) for n in range(1, data['trip_length'] + 1)]
+    return intro, days
+
+def _generate_outline(data, model):
+    prompt = generate_outline_prompt(data)
+    return parse_outline(_chat(prompt, model, max_tokens=120 + 20 * data['trip_length']), data)
+
+async def _generate_day(prompt, model):
+    async with _day_slots:
+        return await _chat_async(prompt, model, DAY_MAX_TOKENS)
+
+def _submit_days(data, model, days):
+    return [eventloop.submit(_generate_day(generate_day_prompt(data, n, theme, days), model)) for n, theme in days]
+
+def _day_replies(futures, outline, failed):
+    """(day, theme, reply) in order; a day whose call failed gets reply None and is added to failed.
+
+    Only when every day failed does the trip fail as a whole.
+    """
+    error = None
+    for future, (n, theme) in zip(futures, outline):
+        try:
+            yield n, theme, future.result()
+        except ItineraryError as e:
+            error = error or e
+            failed.append(n)
+            yield n, theme, None
+    if error is not None and len(failed) == len(outline):
+        raise error
+
+def stream_chunked_itinerary(data, model=DEFAULT_MODEL, failed=None):
+    """Outline first, then every day generated concurrently and yielded in order.
+
+    Output per call is bounded (DAY_MAX_TOKENS per day), so long trips are not
+    truncated and wall-clock time stays close to outline + one day. A day
+    whose call failed keeps just its outline theme; its number goes to failed.
+    """
+    failed = [] if failed is None else failed
+    intro, days = _generate_outline(data, model)
+    futures = _submit_days(data, model, days)
+    try:
+        if intro:
+            yield intro + "\n\n"
+        for n, theme, reply in _day_replies(futures, days, failed):
+            yield (reply.strip() if reply is not None else day_markdown(Day(n, theme, "", "", ""))) + "\n\n"
+    finally:
+        for future in futures:
+            future.cancel()
+
+def generate_chunked_itinerary(data, model=DEFAULT_MODEL, failed=None):
+    return "".join(stream_chunked_itinerary(data, model, failed))
+
+def _use_chunked(data):
+    return CHUNKED_MIN_DAYS and int(data.get("trip_length") or 0) >= CHUNKED_MIN_DAYS
+
+def cohere_calls(data):
+    """How many Cohere calls generating form_data's itinerary takes"""
+    return 1 + int(data["trip_length"]) if _use_chunked(data) else 1
+
+# -------------------- STRUCTURED GENERATION --------------------
+def _as_day(text, number, theme):
+    """Day from a per-day reply; an invalid reply is kept as the day's text"""
+    return parse_day(text, number, theme) or Day(number, theme, text.strip(), "", "")
+
+def generate_structured_itinerary(data, model=DEFAULT_MODEL, failed=None):
+    """Itinerary JSON for form_data: one call, or outline plus per-day calls for long trips.
+
+    As in stream_chunked_itinerary, a failed day keeps its outline theme and is added to failed.
+    """
+    if not _use_chunked(data):
+        return finalize_itinerary(_chat(generate_itinerary_prompt(data), model), data)
+    failed = [] if failed is None else failed
+    intro, outline = _generate_outline(data, model)
+    futures = _submit_days(data, model, outline)
+    try:
+        days = [_as_day(reply, n, theme) if reply is not None else Day(n, theme, "", "", "")
+                for n, theme, reply in _day_replies(futures, outline, failed)]
+    finally:
+        for future in futures:
+            future.cancel()
+    return Itinerary(intro, days).to_json()
+
+# -------------------- ITINERARY CACHE --------------------
+itinerary_cache = DiskCache("itinerary", ttl=ITINERARY_CACHE_TTL, max_entries=ITINERARY_CACHE_MAX_ENTRIES)
+
+# Sessions asking for the same trip at the same time share one Cohere call
+itinerary_flights = SingleFlight("itinerary")
+itinerary_streams = SingleFlight("itinerary-stream")
+
+def normalize_form_data(data):
+    """Canonical view of form_data so equivalent trips share a cache key.
+
+    The origin is left out: it is not part of the prompt, since the plan at the
+    destination does not depend on where the traveller flies from.
+    """
+    return {
+        "destination": str(data.get("destination", "")).strip().casefold(),
+        "trip_length": int(data.get("trip_length", 0)),
+        "start_date": str(data.get("start_date", "")),
+        "end_date": str(data.get("end_date", "")),
+        "budget": str(data.get("budget", "")).strip().lower(),
+        "transportation": str(data.get("transportation", "")).strip().lower(),
+        "activities": sorted({a.strip().lower() for a in data.get("activities") or []}),
+    }
+
+# Markdown and structured itineraries are cached separately
+_KEY_PREFIX = "itinerary-json" if STRUCTURED else "itinerary"
+
+def itinerary_cache_key(data, model=DEFAULT_MODEL):
+    return make_key(_KEY_PREFIX, model, normalize_form_data(data))
+
+# -------------------- DATE-SHIFTED REUSE --------------------
+shifted_cache = DiskCache("itinerary_shifted", ttl=ITINERARY_CACHE_TTL, max_entries=ITINERARY_CACHE_MAX_ENTRIES)
+
+def _as_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value))
+
+def _season(day):
+    return ("winter", "spring", "summer", "autumn")[day.month % 12 // 3]
+
+def date_independent_key(data, model=DEFAULT_MODEL):
+    """Cache key without the trip dates; the season stays in since plans depend on the weather"""
+    fields = normalize_form_data(data)
+    del fields["start_date"], fields["end_date"]
+    fields["season"] = _season(_as_date(data["start_date"]))
+    return make_key(f"{_KEY_PREFIX}-shifted", model, fields)
+
+def _date_spellings(day):
+    """The ways a model tends to write day, in a fixed order so old and new spellings line up"""
+    month, mon = f"{day:%B}", f"{day:%b}"
+    weekday, wd = f"{day:%A}", f"{day:%a}"
+    spellings = [day.isoformat(), f"{day.month}/{day.day}/{day.year}"]
+    for base in (f"{month} {day.day}", f"{mon} {day.day}", f"{day.day} {month}", f"{day.day} {mon}"):
+        for dated in (f"{base}, {day.year}", f"{base} {day.year}", base):
+            spellings += [f"{weekday}, {dated}", f"{wd}, {dated}", f"{weekday} {dated}", dated]
+    return spellings
+
+def shift_dates(text, old_start, new_start, days):
+    """Rewrite each date of the old trip (and its weekday) to the matching date of the new one"""
+    old_start, new_start = _as_date(old_start), _as_date(new_start)
+    if old_start == new_start:
+        return text
+    replacements = {}
+    for offset in range(days + 1):
+        old = old_start + datetime.timedelta(days=offset)
+        new = new_start + datetime.timedelta(days=offset)
+        for old_text, new_text in zip(_date_spellings(old), _date_spellings(new)):
+            replacements.setdefault(old_text, new_text)
+    # One pass, longest spelling first, so "Monday, June 2, 2025" is not rewritten piecewise.
+    # Nothing right after "Day " is a date: in "Day 1 June 1" only "June 1" is rewritten, not "1 June".
+    pattern = re.compile(r"(?<![\w/])(?<![Dd][Aa][Yy] )(?:" + "|".join(
+        re.escape(k) for k in sorted(replacements, key=len, reverse=True)) + r")(?![\w/])")
+    return pattern.sub(lambda m: replacements[m.group(0)], text)
+
+def shift_itinerary(text, old_start, new_start, days):
+    """shift_dates for a stored itinerary, or None if the result is no longer a valid one.
+
+    Structured itineraries only have their text fields rewritten, so day numbers
+    and JSON keys are never touched, and the result is validated again.
+    """
+    itinerary = parse_itinerary(text, days)
+    if not itinerary.structured:
+        return shift_dates(text, old_start, new_start, days)
+    shift = lambda value: shift_dates(value, old_start, new_start, days)
+    shifted = Itinerary(shift(itinerary.intro), [
+        day._replace(theme=shift(day.theme), attraction=shift(day.attraction), food=shift(day.food), tip=shift(day.tip))
+        for day in itinerary.days
+    ])
+    shifted = parse_itinerary(shifted.to_json(), days)
+    return shifted.to_json() if shifted.structured else None
+
+def _cached_itinerary(data, model, key):
+    """Exact-match tier first, then the date-shifted tier; a shifted hit is promoted to the exact tier"""
+    cached = itinerary_cache.get(key)
+    if cached is not None or not ITINERARY_SHIFT_REUSE:
+        return cached
+    entry = shifted_cache.get(date_independent_key(data, model))
+    if entry is None:
+        return None
+    text = shift_itinerary(entry["text"], entry["start_date"], data["start_date"], int(data["trip_length"]))
+    if text is not None:
+        itinerary_cache.set(key, text)
+    return text
+
+def store_itinerary(data, text, model=DEFAULT_MODEL, key=None):
+    """Save a freshly generated itinerary in both cache tiers"""
+    itinerary_cache.set(key or itinerary_cache_key(data, model), text)
+    if ITINERARY_SHIFT_REUSE:
+        shifted_cache.set(date_independent_key(data, model), {"text": text, "start_date": str(data["start_date"])})
+
+def itinerary_cache_stats():
+    return {"exact": itinerary_cache.stats(), "date_shifted": shifted_cache.stats()}
+
+def generate_itinerary_cached(data, model=DEFAULT_MODEL, bypass=False):
+    """Return the itinerary for form_data, calling Cohere only on a cache miss.
+
+    bypass=True (or ITINERARY_CACHE_BYPASS=1) skips the lookup but still
+    refreshes the stored entry. Errors are never cached; they raise ItineraryError.
+    """
+    key = itinerary_cache_key(data, model)
+    if not (bypass or ITINERARY_CACHE_BYPASS):
+        cached = _cached_itinerary(data, model, key)
+        if cached is not None:
+            return cached
+    try:
+        return itinerary_flights.do(key, lambda: _generate_and_cache(data, model, key), timeout=SINGLE_FLIGHT_TIMEOUT)
+    except ItineraryError:
+        raise
+    except Exception as e:
+        raise ItineraryUnavailable(str(e)) from e
+
+def generate_itinerary_text(data, model=DEFAULT_MODEL, failed=None):
+    """Fresh itinerary for form_data in the configured format, chunked for long trips; nothing is cached"""
+    if STRUCTURED:
+        return generate_structured_itinerary(data, model, failed)
+    if _use_chunked(data):
+        return generate_chunked_itinerary(data, model, failed)
+    return _chat(generate_itinerary_prompt(data), model)
+
+def _generate_and_cache(data, model, key):
+    failed = []
+    text = generate_itinerary_text(data, model, failed)
+    # An itinerary with days missing is shown but not cached, so the next request tries again
+    if not failed:
+        store_itinerary(data, text, model, key)
+    return text
+
+def stream_itinerary_cached(data, model=DEFAULT_MODEL, bypass=False):
+    """Streaming counterpart of generate_itinerary_cached.
+
+    A cache hit is yielded as a single chunk. The joined text is only cached
+    once the stream has completed, so interrupted or failed generations are
+    never stored. Failures raise ItineraryError, possibly after some text.
+    """
+    key = itinerary_cache_key(data, model)
+    if not (bypass or ITINERARY_CACHE_BYPASS):
+        cached = _cached_itinerary(data, model, key)
+        if cached is not None:
+            yield cached
+            return
+    try:
+        yield from itinerary_streams.stream(
+            key, lambda: _stream_and_cache(data, model, key), timeout=SINGLE_FLIGHT_TIMEOUT)
+    except ItineraryError:
+        raise
+    except Exception as e:
+        raise ItineraryUnavailable(str(e)) from e
+
+def _stream_and_cache(data, model, key):
+    chunks = []
+    failed = []
+    if STRUCTURED:
+        # JSON is only useful once complete, so it is sent as a single chunk
+        stream = iter([generate_structured_itinerary(data, model, failed)])
+    elif _use_chunked(data):
+        stream = stream_chunked_itinerary(data, model, failed)
+    else:
+        stream = stream_with_cohere(generate_itinerary_prompt(data), model)
+    for chunk in stream:
+        chunks.append(chunk)
+        yield chunk
+    if not failed:
+        store_itinerary(data, "".join(chunks), model, key)
+
+def regenerate_day(data, number, model=DEFAULT_MODEL):
+    """Structured mode: rewrite one day of the trip's itinerary and store the result.
 
+    The other days are reused from the cache (generated first if missing).
+    """
+    itinerary = parse_itinerary(generate_itinerary_cached(data, model))
+    if not itinerary.structured:
+        raise ItineraryUnavailable("itinerary is not structured; regenerate the whole trip instead")
+    outline = [(day.number, day.theme) for day in itinerary.days]
+    theme = dict(outline).get(number, f"Exploring {data['destination']}")
+    day = _as_day(_chat(generate_day_prompt(data, number, theme, outline), model, DAY_MAX_TOKENS), number, theme)
+    itinerary = itinerary.replace_day(day)
+    store_itinerary(data, itinerary.to_json(), model)
+    return itinerary
@@ -0,0 +1,187 @@
+# batch.py
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_itinerary import (DEFAULT_MODEL, ItineraryRateLimited, cohere_calls, count_usage, generate_itinerary_text,
+                          store_itinerary)
+from cache import make_key
+from planner import parse_form_data
+
+
+def trip_id(trip):
+    """Stable id for a trip: its "id" field, else a hash of its contents"""
+    if trip.get("id"):
+        return str(trip["id"])
+    return make_key("batch", trip)[:16]
+
+
+def read_trips(path):
+    """Yield (line_no, trip) from a JSONL file without loading it all"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                yield line_no, json.loads(line)
+
+
+def completed_ids(path):
+    """Ids already written to the output file; it doubles as the checkpoint"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def truncate_torn_tail(path, block_size=64 * 1024):
+    """Cut a half-written last record (from a crash) off the output file; returns bytes removed"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r+b") as f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end:
+            start = max(0, end - block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+    return size - end
+
+
+class Pacer:
+    """Spaces out call starts to stay under a requests-per-minute budget"""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self, calls=1):
+        """Block until `calls` more requests fit in the budget"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval * calls
+        if start > now:
+            time.sleep(start - now)
+
+    def back_off(self, seconds):
+        with self.lock:
+            self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+def generate_one(trip, model, pacer, retries):
+    """(itinerary, token usage, seconds, failed day numbers) for one trip; long trips are generated a day per call"""
+    data = parse_form_data(trip)
+    delay = 2.0
+    for attempt in range(retries + 1):
+        pacer.wait(cohere_calls(data))
+        started = time.monotonic()
+        failed = []
+        try:
+            with count_usage() as usage:
+                text = generate_itinerary_text(data, model, failed)
+        except ItineraryRateLimited:
+            # Each call was already retried; slow every worker down before trying again
+            if attempt < retries:
+                pacer.back_off(delay)
+                time.sleep(delay * (1 + random.random()))
+                delay *= 2
+                continue
+            raise
+        # Also serve these trips from the web app's cache, unless days are missing
+        if not failed:
+            store_itinerary(data, text, model)
+        return text, usage, time.monotonic() - started, failed
+
+
+def run_batch(input_path, output_path, model=DEFAULT_MODEL, concurrency=4, rpm=0, retries=4):
+    done = completed_ids(output_path)
+    pacer = Pacer(rpm)
+    totals = {"ok": 0, "failed": 0, "skipped": 0, "input_tokens": 0, "output_tokens": 0}
+    write_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency * 2)  # keeps the input streaming
+
+    # Drop a torn last line before appending, so the output stays valid JSONL
+    torn = truncate_torn_tail(output_path)
+    if torn:
+        print(f"dropped {torn} bytes of a partially written record", file=sys.stderr)
+
+    started = time.monotonic()
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        def write(record):
+            with write_lock:
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+
+        def work(tid, trip):
+            try:
+                text, usage, elapsed, failed = generate_one(trip, model, pacer, retries)
+                record = {"id": tid, "status": "ok", "trip": trip, "itinerary": text,
+                          "usage": usage, "seconds": round(elapsed, 3)}
+                if failed:
+                    # Kept for inspection, but not checkpointed: the next run generates the trip again
+                    record.update(status="partial", failed_days=failed)
+                write(record)
+                with write_lock:
+                    totals["failed" if failed else "ok"] += 1
+                    totals["input_tokens"] += usage["input_tokens"]
+                    totals["output_tokens"] += usage["output_tokens"]
+            except Exception as e:
+                write({"id": tid, "status": "error", "trip": trip, "error": str(e)})
+                with write_lock:
+                    totals["failed"] += 1
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            for line_no, trip in read_trips(input_path):
+                tid = trip_id(trip)
+                if tid in done:
+                    totals["skipped"] += 1
+                    continue
+                done.add(tid)
+                slots.acquire()
+                pool.submit(work, tid, trip)
+
+    elapsed = time.monotonic() - started
+    totals["seconds"] = round(elapsed, 2)
+    totals["trips_per_min"] = round(totals["ok"] / elapsed * 60, 2) if elapsed else 0.0
+    totals["output_tokens_per_s"] = round(totals["output_tokens"] / elapsed, 2) if elapsed else 0.0
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate itineraries for trips in a JSONL file")
+    parser.add_argument("input", help="JSONL file, one form_data object per line (optional \"id\")")
+    parser.add_argument("output", help="JSONL results file; re-running resumes after the last completed trip")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=0, help="max Cohere requests per minute (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=4, help="retries per trip on rate-limit errors")
+    args = parser.parse_args()
+
+    totals = run_batch(args.input, args.output, args.model, args.concurrency, args.rpm, args.retries)
+    print(f"{totals['ok']} generated, {totals['failed']} failed, {totals['skipped']} already done "
+          f"in {totals['seconds']}s: {totals['trips_per_min']} trips/min, "
+          f"{totals['output_tokens_per_s']} output tokens/s", file=sys.stderr)
+    if totals["failed"]:
+        sys.exit(1)
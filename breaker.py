@@ -0,0 +1,110 @@
+# breaker.py
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one live data source.
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls` are
+    recorded and the share of failures (errors, empty results or calls slower
+    than `slow_call`) reaches `failure_rate`, the breaker opens and callers
+    should go straight to their fallback. After `cooldown` seconds one trial call
+    is let through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5, cooldown=30.0, slow_call=10.0):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.slow_call = slow_call
+        self.state = CLOSED
+        self.opened_at = None
+        self.last_error = None
+        self._outcomes = deque(maxlen=window)  # (ok, latency)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether the live source should be tried now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record(self, ok, latency, error=None):
+        """Record the outcome of a call that allow() let through"""
+        ok = ok and latency <= self.slow_call
+        with self._lock:
+            self._outcomes.append((ok, latency))
+            if not ok:
+                self.last_error = error or f"slow call ({latency:.1f}s)"
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                if ok:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+            elif self.state == CLOSED and self._tripped():
+                self._open()
+
+    def _tripped(self):
+        if len(self._outcomes) < self.min_calls:
+            return False
+        failures = sum(1 for ok, _ in self._outcomes if not ok)
+        return failures / len(self._outcomes) >= self.failure_rate
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def health(self):
+        with self._lock:
+            latencies = sorted(latency for _, latency in self._outcomes)
+            failures = sum(1 for ok, _ in self._outcomes if not ok)
+            calls = len(self._outcomes)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+            return {
+                "source": self.name,
+                "state": self.state,
+                "calls": calls,
+                "failure_rate": failures / calls if calls else 0.0,
+                "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+                "latency_max": latencies[-1] if latencies else None,
+                "retry_in": retry_in,
+                "last_error": self.last_error,
+            }
+
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name, **settings):
+    """Process-wide breaker for name; settings only apply when it is first created"""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **settings)
+        return _breakers[name]
+
+
+def health_snapshot():
+    """State and recent latency of every registered source"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.health() for b in breakers}
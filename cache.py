@@ -0,0 +1,171 @@
+# cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+CACHE_PATH = os.getenv(
+    "TRAVEL_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "travel_cache.sqlite3"),
+)
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+@contextmanager
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _init_db(path):
+    with _init_lock:
+        if path in _initialized:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _connect(path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, last_access)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    namespace TEXT NOT NULL,
+                    counter TEXT NOT NULL,
+                    value INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (namespace, counter)
+                )
+            """)
+        _initialized.add(path)
+
+
+def make_key(*parts):
+    """Stable hash of JSON-serializable parts, used as a cache key"""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """SQLite-backed cache with TTL and LRU size cap.
+
+    All namespaces live in one database file, so every Streamlit session and
+    every server process on the host sees the same entries and counters.
+    """
+
+    def __init__(self, namespace, ttl, max_entries, path=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or CACHE_PATH
+        _init_db(self.path)
+
+    def _bump(self, conn, counter, amount=1):
+        conn.execute(
+            "INSERT INTO stats (namespace, counter, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace, counter) DO UPDATE SET value = value + excluded.value",
+            (self.namespace, counter, amount),
+        )
+
+    def get(self, key, default=None):
+        now = time.time()
+        with _connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._bump(conn, "misses")
+                return default
+            conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._bump(conn, "hits")
+        return json.loads(row[0])
+
+    def contains(self, key):
+        """Whether a live entry exists, without touching counters or LRU order"""
+        with _connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT 1 FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, key, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with _connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, default=str), now, expires_at, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM entries WHERE namespace = ? ORDER BY last_access ASC LIMIT ?)",
+                (self.namespace, self.namespace, overflow),
+            )
+            self._bump(conn, "evictions", overflow)
+
+    def values(self):
+        """Live values in the namespace, without touching counters or LRU order"""
+        with _connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND expires_at > ?", (self.namespace, time.time())
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    def delete(self, key):
+        with _connect(self.path) as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        with _connect(self.path) as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+            conn.execute("DELETE FROM stats WHERE namespace = ?", (self.namespace,))
+
+    def stats(self):
+        with _connect(self.path) as conn:
+            counters = dict(conn.execute(
+                "SELECT counter, value FROM stats WHERE namespace = ?", (self.namespace,)
+            ).fetchall())
+            (size,) = conn.execute("SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "namespace": self.namespace,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "entries": size,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,173 @@
+# cards.py
+import hashlib
+import html
+import json
+import string
+import threading
+import time
+from functools import lru_cache
+
+# Rendered tabs kept per process, keyed by the result set
+CARD_CACHE_SIZE = 256
+
+
+class CardTemplate:
+    """Card markup parsed once at import; field values are HTML-escaped on render.
+
+    Only flat {name} fields are supported. Styling lives in shared CSS classes
+    (theme.py), so the markup carries no inline styles.
+    """
+
+    def __init__(self, markup):
+        # One line per card: indented lines inside st.markdown would be read as code blocks
+        markup = "".join(line.strip() for line in markup.strip().splitlines())
+        self._parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(markup)]
+
+    def render(self, fields):
+        out = []
+        for literal, field in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(html.escape(str(fields[field])))
+        return "".join(out)
+
+
+FLIGHT_CARD = CardTemplate("""
+<div class="travel-item">
+    <div class="card-row">
+        <div><span class="card-title">{airline}</span><span class="card-meta"> • Flight {flight_number}</span></div>
+        <div class="card-price">{price}</div>
+    </div>
+    <div class="card-row card-section">
+        <div><div class="card-time">{departure_time}</div><div class="card-meta">{origin}</div></div>
+        <div class="flight-path">
+            <div class="card-small">{duration}</div>
+            <div class="flight-line"></div>
+            <div class="card-small">{stops}</div>
+        </div>
+        <div class="card-end"><div class="card-time">{arrival_time}</div><div class="card-meta">{destination}</div></div>
+    </div>
+    <div class="card-actions"><button class="secondary-btn btn-small">View Details</button></div>
+</div>
+""")
+
+HOTEL_CARD = CardTemplate("""
+<div class="travel-item">
+    <div class="card-row">
+        <div class="card-title">{name}</div>
+        <div class="card-price">{price}/night</div>
+    </div>
+    <div class="card-body">{description}</div>
+    <div class="card-row card-section">
+        <div><span class="chip">Wi-Fi</span><span class="chip">Breakfast</span><span class="chip">Pool</span></div>
+        <button class="secondary-btn btn-small">Book Now</button>
+    </div>
+</div>
+""")
+
+CAR_CARD = CardTemplate("""
+<div class="travel-item">
+    <div class="card-row">
+        <div class="card-title">{car_type}</div>
+        <div class="card-price">{price_per_day}/day</div>
+    </div>
+    <div class="card-body">{description}</div>
+    <div class="card-row card-section">
+        <div><span class="chip">{seats} seats</span><span class="chip">{transmission}</span><span class="chip">{category}</span></div>
+        <button class="secondary-btn btn-small">Reserve</button>
+    </div>
+</div>
+""")
+
+
+def _money(value):
+    value = str(value)
+    return value if value.startswith("$") else f"${value}"
+
+
+def _nightly_price(name):
+    """Stable placeholder rate for hotels without a price, so a result set always renders the same"""
+    return f"${80 + int(hashlib.sha256(name.encode()).hexdigest(), 16) % 221}"
+
+
+def _flight_fields(f):
+    return dict(f, price=_money(f["price"]), stops=f.get("stops", "Direct"))
+
+
+def hotel_price(hotel):
+    return _money(hotel["price_per_night"]) if hotel.get("price_per_night") else _nightly_price(hotel["name"])
+
+
+def _hotel_fields(hotel):
+    return {"name": hotel["name"], "description": hotel.get("description", "No description available"),
+            "price": hotel_price(hotel)}
+
+
+def _car_fields(car):
+    return {"car_type": car["car_type"], "price_per_day": _money(car["price_per_day"]),
+            "description": car.get("description", "Comfortable ride for your trip."),
+            "seats": car.get("seats", 5), "transmission": car.get("transmission", "Automatic"),
+            "category": car.get("category", "Compact")}
+
+
+_KINDS = {
+    "flights": (FLIGHT_CARD, _flight_fields),
+    "hotels": (HOTEL_CARD, _hotel_fields),
+    "car_rentals": (CAR_CARD, _car_fields),
+}
+
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def _render(kind, payload):
+    template, fields = _KINDS[kind]
+    return "".join(template.render(fields(item)) for item in json.loads(payload))
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def render_cards(kind, items):
+    """HTML for a whole tab of cards, for a single st.markdown call; cached per result set"""
+    payload = json.dumps(items, sort_keys=True, default=str)
+    started = time.perf_counter()
+    markup = _render(kind, payload)
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        stats = _stats.setdefault(kind, {"renders": 0, "bytes": 0, "seconds": 0.0})
+        stats["renders"] += 1
+        stats["bytes"] += len(markup.encode("utf-8"))
+        stats["seconds"] += elapsed
+    return markup
+
+
+def render_stats():
+    """Per tab: renders, average payload bytes and render time, plus cache hit counts"""
+    with _stats_lock:
+        report = {kind: {"renders": s["renders"], "avg_bytes": s["bytes"] // s["renders"],
+                         "avg_render_us": round(s["seconds"] / s["renders"] * 1e6, 1)}
+                  for kind, s in _stats.items()}
+    info = _render.cache_info()
+    report["cache"] = {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+    return report
+
+
+if __name__ == "__main__":
+    from mock_data import generate_mock_car_rentals, generate_mock_flights
+
+    samples = {
+        "flights": generate_mock_flights("Lisbon", "Paris", "2025-06-01", "2025-06-06"),
+        "hotels": [{"name": f"Hotel {i}", "description": "Centrally located hotel with modern amenities."}
+                   for i in range(3)],
+        "car_rentals": generate_mock_car_rentals("Paris", "2025-06-01", "2025-06-06"),
+    }
+    for kind, items in samples.items():
+        _render.cache_clear()
+        started = time.perf_counter()
+        markup = render_cards(kind, items)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        render_cards(kind, items)
+        warm = time.perf_counter() - started
+        print(f"{kind:<12} {len(items)} cards, {len(markup.encode('utf-8'))} bytes in one call, "
+              f"{cold * 1e6:.0f}us cold, {warm * 1e6:.0f}us cached")
@@ -0,0 +1,56 @@
+# eventloop.py
+import asyncio
+import threading
+
+_lock = threading.Lock()
+_loop = None
+_thread = None
+
+
+def get_loop():
+    """The process-wide event loop, running in a daemon thread started on first use"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="event-loop", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def submit(coro):
+    """Schedule coro on the shared loop; returns a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """Run coro on the shared loop, blocking the calling thread until it finishes"""
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("eventloop.run() called from the event loop thread; await the coroutine instead")
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+async def _next(agen):
+    return await agen.__anext__()
+
+
+async def _close(agen):
+    await agen.aclose()
+
+
+def iterate(agen):
+    """Drive an async generator from synchronous code, one item per round trip to the loop"""
+    try:
+        while True:
+            try:
+                yield run(_next(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        run(_close(agen))
@@ -0,0 +1,351 @@
+# exports.py
+import argparse
+import base64
+import datetime
+import os
+import re
+import sys
+import textwrap
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_itinerary import _OUTLINE_DAY
+from cache import DiskCache, make_key
+from cards import _money, hotel_price
+from itinerary import Day, Itinerary, parse_itinerary
+from offers import parse_minutes
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+EXPORT_CACHE_TTL = int(os.getenv("EXPORT_CACHE_TTL", 7 * 24 * 3600))
+EXPORT_CACHE_MAX_ENTRIES = int(os.getenv("EXPORT_CACHE_MAX_ENTRIES", 200))
+
+# format -> (mime type, file extension)
+FORMATS = {"pdf": ("application/pdf", "pdf"), "ics": ("text/calendar", "ics")}
+
+# Offers of each kind included in an export, in the order the results page lists them
+SELECTED_OFFERS = 3
+
+# Finished files, shared by every process on the host and keyed by content hash
+export_cache = DiskCache("exports", ttl=EXPORT_CACHE_TTL, max_entries=EXPORT_CACHE_MAX_ENTRIES)
+
+_pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+_lock = threading.Lock()
+_jobs = {}  # key -> Future, while the export is being built
+
+
+# -------------------- JOBS --------------------
+def export_payload(form_data, itinerary_text, travel_data):
+    """Everything an export depends on, as plain JSON-able data"""
+    trip = {name: str(value) for name, value in form_data.items() if name != "activities"}
+    trip["activities"] = list(form_data.get("activities") or [])
+    payload = {"trip": trip, "itinerary": itinerary_text or ""}
+    for kind in ("flights", "hotels", "car_rentals"):
+        payload[kind] = list(travel_data.get(kind) or [])[:SELECTED_OFFERS]
+    return payload
+
+
+def export_key(fmt, payload):
+    return make_key("export", fmt, payload)
+
+
+def request_export(fmt, payload):
+    """Start building the export in the background (once per content hash); returns its key"""
+    key = export_key(fmt, payload)
+    if export_cache.contains(key):
+        return key
+    with _lock:
+        if key not in _jobs:
+            _jobs[key] = _pool.submit(_build, fmt, key, payload)
+    return key
+
+
+def _build(fmt, key, payload):
+    data = RENDERERS[fmt](payload)
+    export_cache.set(key, base64.b64encode(data).decode("ascii"))
+    return len(data)
+
+
+def is_pending(key):
+    with _lock:
+        job = _jobs.get(key)
+    return job is not None and not job.done()
+
+
+def export_status(key):
+    """("ready", None), ("pending", None), ("failed", message) or ("missing", None).
+
+    Cheap enough to poll: it checks the cache without reading the file or
+    touching its hit/miss counters. export_file() loads a ready file.
+    """
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None and job.done():
+            del _jobs[key]
+    if job is not None and not job.done():
+        return "pending", None
+    if job is not None and job.exception() is not None:
+        return "failed", str(job.exception())
+    if not export_cache.contains(key):
+        return "missing", None
+    return "ready", None
+
+
+def export_file(key):
+    """The finished file's bytes, or None if it is not (or no longer) cached"""
+    cached = export_cache.get(key)
+    return None if cached is None else base64.b64decode(cached)
+
+
+def export_stats():
+    with _lock:
+        building = sum(1 for job in _jobs.values() if not job.done())
+    return {"building": building, "cache": export_cache.stats()}
+
+
+# -------------------- CONTENT --------------------
+_MARKUP = re.compile(r"\*\*|__|`|^#+\s*", re.MULTILINE)
+
+
+def _plain(text):
+    return _MARKUP.sub("", text).strip()
+
+
+def itinerary_days(text):
+    """(intro, [Day]) from a stored itinerary, structured or markdown"""
+    itinerary = parse_itinerary(text)
+    if itinerary.structured:
+        return itinerary.intro, list(itinerary.days)
+    intro, days, body = [], [], None
+    for line in (itinerary.markdown or "").splitlines():
+        heading = _OUTLINE_DAY.match(line)
+        if heading:
+            body = []
+            days.append((int(heading.group(1)), _plain(heading.group(2)), body))
+        elif body is not None:
+            body.append(line)
+        else:
+            intro.append(line)
+    return (_plain("\n".join(intro)),
+            [Day(n, theme, _plain("\n".join(lines)), "", "") for n, theme, lines in days])
+
+
+def _start_date(payload):
+    return datetime.date.fromisoformat(payload["trip"]["start_date"])
+
+
+def _end_date(payload):
+    return datetime.date.fromisoformat(payload["trip"]["end_date"])
+
+
+def _offer_lines(payload):
+    """(heading, [lines]) for the selected flights, hotels and cars"""
+    sections = []
+    if payload["flights"]:
+        sections.append(("Flights", [
+            f"{f['airline']} {f['flight_number']}: {f['origin']} {f['departure_time']} -> "
+            f"{f['destination']} {f['arrival_time']} ({f['duration']}), {_money(f['price'])}"
+            for f in payload["flights"]
+        ]))
+    if payload["hotels"]:
+        sections.append(("Hotels", [
+            f"{h['name']}, {hotel_price(h)}/night: {h.get('description', '')}".strip() for h in payload["hotels"]
+        ]))
+    if payload["car_rentals"]:
+        sections.append(("Car rentals", [
+            f"{c.get('company', '')} {c['car_type']} ({c.get('category', '')}), {_money(c['price_per_day'])}/day"
+            for c in payload["car_rentals"]
+        ]))
+    return sections
+
+
+# -------------------- PDF --------------------
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 595, 842, 56  # A4 in points
+_STYLES = {"title": ("F2", 20, 28), "heading": ("F2", 13, 20), "body": ("F1", 10.5, 14)}
+# Helvetica averages about half an em per character
+_WRAP = {style: int((PAGE_WIDTH - 2 * MARGIN) / (size * 0.5)) for style, (_, size, _) in _STYLES.items()}
+
+
+def _pdf_text(text):
+    data = text.encode("cp1252", "replace")  # WinAnsiEncoding of the base-14 fonts
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _pdf_lines(payload):
+    """(style, text) lines of the document, wrapped to the page width"""
+    trip = payload["trip"]
+    intro, days = itinerary_days(payload["itinerary"])
+    blocks = [("title", f"{trip['destination']} itinerary"),
+              ("body", f"{trip['start_date']} to {trip['end_date']} - {trip['trip_length']} days - "
+                       f"{trip['budget']} budget - {trip['transportation']}"),
+              ("body", intro)]
+    for day in days:
+        blocks.append(("heading", f"Day {day.number}: {day.theme}"))
+        blocks.extend(("body", text) for text in (day.attraction, day.food and f"Food: {day.food}",
+                                                  day.tip and f"Tip: {day.tip}") if text)
+    for heading, lines in _offer_lines(payload):
+        blocks.append(("heading", heading))
+        blocks.extend(("body", f"- {line}") for line in lines)
+    out = []
+    for style, text in blocks:
+        for paragraph in text.splitlines() or [""]:
+            out.extend((style, line) for line in textwrap.wrap(paragraph, _WRAP[style]) or [""])
+    return out
+
+
+def render_pdf(payload):
+    """Multi-page text PDF using the built-in Helvetica fonts (no extra dependency)"""
+    pages, ops, y = [], [], PAGE_HEIGHT - MARGIN
+    for style, text in _pdf_lines(payload):
+        font, size, leading = _STYLES[style]
+        if style != "body":
+            y -= leading / 2
+        if y - leading < MARGIN:
+            pages.append(ops)
+            ops, y = [], PAGE_HEIGHT - MARGIN
+        y -= leading
+        if text:
+            ops.append(b"BT /%s %g Tf %d %.1f Td (%s) Tj ET" % (font.encode(), size, MARGIN, y, _pdf_text(text)))
+    pages.append(ops)
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for ops in pages:
+        stream = b"\n".join(ops)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+                       % (PAGE_WIDTH, PAGE_HEIGHT, len(objects)))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# -------------------- ICS --------------------
+def _ics_text(text):
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line):
+    """Split content lines longer than 75 octets, as RFC 5545 requires"""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(data):
+        end = min(len(data), start + (75 if not parts else 74))
+        while end < len(data) and data[end] & 0xC0 == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start = end
+    return "\r\n ".join(parts)
+
+
+def _event(uid, stamp, start, end, summary, description=""):
+    value = "VALUE=DATE:" if isinstance(start, datetime.date) and not isinstance(start, datetime.datetime) else ""
+    fmt = "%Y%m%d" if value else "%Y%m%dT%H%M%S"
+    lines = ["BEGIN:VEVENT", f"UID:{uid}@travelbuddy", f"DTSTAMP:{stamp}",
+             f"DTSTART;{value}{start:{fmt}}" if value else f"DTSTART:{start:{fmt}}",
+             f"DTEND;{value}{end:{fmt}}" if value else f"DTEND:{end:{fmt}}",
+             f"SUMMARY:{_ics_text(summary)}"]
+    if description:
+        lines.append(f"DESCRIPTION:{_ics_text(description)}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def render_ics(payload):
+    """Calendar with one all-day event per itinerary day, plus the first listed flight, hotel stay and car"""
+    uid = export_key("ics", payload)[:16]
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    start, end = _start_date(payload), _end_date(payload)
+    destination = payload["trip"]["destination"]
+    _, days = itinerary_days(payload["itinerary"])
+
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//TravelBuddy//Itinerary//EN", "CALSCALE:GREGORIAN",
+             f"X-WR-CALNAME:{_ics_text(destination)} trip"]
+    for day in days:
+        date = start + datetime.timedelta(days=day.number - 1)
+        details = "\n".join(text for text in (day.attraction, day.food and f"Food: {day.food}",
+                                              day.tip and f"Tip: {day.tip}") if text)
+        lines += _event(f"{uid}-day{day.number}", stamp, date, date + datetime.timedelta(days=1),
+                        f"{destination} day {day.number}: {day.theme}", details)
+    for i, f in enumerate(payload["flights"][:1]):
+        try:
+            hour, minute = map(int, str(f["departure_time"]).split(":")[:2])
+        except ValueError:
+            continue
+        # Times are local to the departure airport, so they are written as floating times
+        departs = datetime.datetime.combine(start, datetime.time(hour, minute))
+        lines += _event(f"{uid}-flight{i}", stamp, departs, departs + datetime.timedelta(minutes=parse_minutes(f["duration"]) or 60),
+                        f"Flight {f['airline']} {f['flight_number']} {f['origin']} -> {f['destination']}",
+                        f"{f['duration']}, {_money(f['price'])}")
+    for i, hotel in enumerate(payload["hotels"][:1]):
+        lines += _event(f"{uid}-hotel{i}", stamp, start, end, f"Stay: {hotel['name']}",
+                        f"{hotel.get('description', '')} {hotel.get('url', '')}".strip())
+    for i, car in enumerate(payload["car_rentals"][:1]):
+        lines += _event(f"{uid}-car{i}", stamp, start, end, f"Car rental: {car.get('company', '')} {car['car_type']}",
+                        car.get("pickup_location", ""))
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+RENDERERS = {"pdf": render_pdf, "ics": render_ics}
+
+
+# -------------------- BENCHMARK --------------------
+def _sample_payload(days):
+    from mock_data import generate_mock_car_rentals, generate_mock_flights
+
+    start = datetime.date(2025, 6, 1)
+    end = start + datetime.timedelta(days=days)
+    sentence = "Walk the old town, then take the tram across the river to the covered market for lunch. "
+    itinerary = Itinerary("An introduction to the city. " * 8, [
+        Day(n, f"Neighbourhood {n}", sentence * 5, "Local bistro near the square", "Book museum tickets online.")
+        for n in range(1, days + 1)
+    ])
+    form_data = {"origin": "Lisbon", "destination": "Paris", "trip_length": days, "start_date": start,
+                 "end_date": end, "budget": "medium", "activities": ["museums"], "transportation": "public"}
+    travel_data = {"flights": generate_mock_flights("Lisbon", "Paris", start, end),
+                   "hotels": [{"name": f"Hotel {i}", "description": "Central and quiet."} for i in range(3)],
+                   "car_rentals": generate_mock_car_rentals("Paris", start, end)}
+    return export_payload(form_data, itinerary.to_json(), travel_data)
+
+
+def benchmark(lengths, runs):
+    print(f"{'days':>5} {'format':>6} {'bytes':>8} {'median ms':>10} {'max ms':>8}")
+    for days in lengths:
+        payload = _sample_payload(days)
+        for fmt, render in RENDERERS.items():
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                data = render(payload)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            print(f"{days:>5} {fmt:>6} {len(data):>8} {timings[len(timings) // 2]:>10.2f} {timings[-1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export latency by trip length")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[3, 7, 14, 30])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    benchmark(args.lengths, args.runs)
+    sys.exit(0)
@@ -0,0 +1,79 @@
+# fanout.py
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Shared by every session in the process. Work abandoned after its deadline keeps
+# its worker until the underlying call returns, so leave headroom above the
+# number of sources per request.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fanout")
+
+
+class Source:
+    """One data source of a fan-out: the live call, its fallback and its deadline (seconds)"""
+
+    def __init__(self, name, fn, fallback, deadline):
+        self.name = name
+        self.fn = fn
+        self.fallback = fallback
+        self.deadline = deadline
+
+
+class FanOut:
+    """Handle for sources running concurrently; result() collects them"""
+
+    def __init__(self, sources, executor=None):
+        self.sources = list(sources)
+        self.started = time.monotonic()
+        self.futures = {}
+        self.report = {}
+        self._results = None
+        executor = executor or _executor
+        for source in self.sources:
+            self.futures[source.name] = executor.submit(self._timed, source)
+
+    @staticmethod
+    def _timed(source):
+        start = time.monotonic()
+        value = source.fn()
+        return value, time.monotonic() - start
+
+    def done(self):
+        return all(f.done() for f in self.futures.values())
+
+    def result(self):
+        """Wait for every source up to its own deadline.
+
+        Sources are collected in deadline order, so a slow source falls back as
+        soon as its own deadline passes instead of when the slowest one finishes.
+        Expired work is cancelled if it has not started yet and its result is
+        discarded otherwise. Returns {name: value}; report holds per-source status.
+        """
+        if self._results is not None:
+            return self._results
+        results = {}
+        for source in sorted(self.sources, key=lambda s: s.deadline):
+            future = self.futures[source.name]
+            remaining = max(0.0, self.started + source.deadline - time.monotonic())
+            try:
+                value, elapsed = future.result(timeout=remaining)
+                results[source.name] = value
+                self.report[source.name] = {"status": "ok", "elapsed": elapsed}
+                continue
+            except (FutureTimeout, CancelledError):
+                future.cancel()
+                self.report[source.name] = {"status": "timeout", "elapsed": source.deadline}
+            except Exception as e:
+                self.report[source.name] = {
+                    "status": "error",
+                    "elapsed": time.monotonic() - self.started,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                }
+            results[source.name] = source.fallback()
+        self._results = results
+        return results
+
+
+def fan_out(sources, executor=None):
+    """Start all sources concurrently and return a FanOut handle without blocking"""
+    return FanOut(sources, executor)
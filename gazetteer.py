@@ -0,0 +1,224 @@
+# gazetteer.py
+import argparse
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import sys
+import threading
+import unicodedata
+import zlib
+from collections import namedtuple
+
+# GeoNames "cities" dump (tab-separated, 19 columns); the bundled file is a small extract in
+# that format, point this at cities15000.txt from download.geonames.org for full coverage
+_HERE = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_SOURCE = os.getenv("GAZETTEER_SOURCE", os.path.join(_HERE, "data", "cities.tsv"))
+GAZETTEER_INDEX = os.getenv("GAZETTEER_INDEX", os.path.join(_HERE, ".cache", "gazetteer.idx"))
+
+City = namedtuple("City", "name country lat lon timezone population")
+
+# Index layout: header | cities (most populous first) | keys (sorted) | hash slots | timezones | strings
+_MAGIC = b"GAZ2"
+_HEADER = struct.Struct("<4sIIII")            # magic, cities, keys, slots, timezones
+_CITY = struct.Struct("<IHffI2sH")           # name offset/len, lat, lon, population, country, tz
+_KEY = struct.Struct("<IHI")                 # key offset/len, city
+_SLOT = struct.Struct("<I")                  # key index + 1, 0 = empty
+_TZ = struct.Struct("<IH")                   # name offset/len
+
+
+def normalize(name):
+    """Lookup key: case-folded, accents stripped, whitespace collapsed"""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def read_geonames(path):
+    """City records from a GeoNames cities dump"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\r\n").split("\t")
+            if len(cols) < 18 or not cols[1]:
+                continue
+            yield {"name": cols[1], "ascii_name": cols[2], "lat": float(cols[4]), "lon": float(cols[5]),
+                   "country": cols[8], "population": int(cols[14] or 0), "timezone": cols[17]}
+
+
+def build_index(source=GAZETTEER_SOURCE, target=GAZETTEER_INDEX):
+    """Compile a GeoNames dump into the binary index at target; returns the number of cities"""
+    # Population order makes "most populous first" the same as "lowest city number first"
+    cities = sorted(read_geonames(source), key=lambda c: -c["population"])
+    strings = bytearray()
+
+    def intern(text):
+        data = text.encode("utf-8")
+        strings.extend(data)
+        return len(strings) - len(data), len(data)
+
+    timezones = sorted({c["timezone"] for c in cities})
+    tz_ids = {tz: i for i, tz in enumerate(timezones)}
+
+    # Both spellings of a name point at the city; the most populous city wins a shared key
+    keys = sorted({(normalize(n).encode("utf-8"), i)
+                   for i, c in enumerate(cities) for n in (c["name"], c["ascii_name"]) if n})
+
+    slots = [0] * max(8, 1 << (2 * len(keys)).bit_length())
+    mask = len(slots) - 1
+    for index, (key, _) in enumerate(keys):
+        if index and keys[index - 1][0] == key:
+            continue
+        slot = zlib.crc32(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+
+    out = bytearray(_HEADER.pack(_MAGIC, len(cities), len(keys), len(slots), len(timezones)))
+    for c in cities:
+        out += _CITY.pack(*intern(c["name"]), c["lat"], c["lon"], c["population"],
+                          c["country"].encode("ascii")[:2].ljust(2), tz_ids[c["timezone"]])
+    for key, city in keys:
+        out += _KEY.pack(*intern(key.decode("utf-8")), city)
+    for slot in slots:
+        out += _SLOT.pack(slot)
+    for tz in timezones:
+        out += _TZ.pack(*intern(tz))
+    out += strings
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(out)
+    os.replace(tmp, target)
+    return len(cities)
+
+
+class Gazetteer:
+    """Read-only view of a compiled index.
+
+    The file is memory-mapped, so every process on the host shares the same
+    pages. Exact lookups go through the hash slots; prefix search bisects the
+    sorted keys to the range sharing the prefix.
+    """
+
+    def __init__(self, path=GAZETTEER_INDEX):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._n_cities, self._n_keys, self._n_slots, self._n_tz = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a gazetteer index")
+        self._cities_at = _HEADER.size
+        self._keys_at = self._cities_at + self._n_cities * _CITY.size
+        self._slots_at = self._keys_at + self._n_keys * _KEY.size
+        self._tz_at = self._slots_at + self._n_slots * _SLOT.size
+        self._strings_at = self._tz_at + self._n_tz * _TZ.size
+
+    def __len__(self):
+        return self._n_cities
+
+    def _string(self, offset, length):
+        start = self._strings_at + offset
+        return self._mm[start:start + length]
+
+    def _key(self, index):
+        offset, length, city = _KEY.unpack_from(self._mm, self._keys_at + index * _KEY.size)
+        return self._string(offset, length), city
+
+    def _city(self, index):
+        offset, length, lat, lon, population, country, tz = _CITY.unpack_from(
+            self._mm, self._cities_at + index * _CITY.size)
+        tz_offset, tz_length = _TZ.unpack_from(self._mm, self._tz_at + tz * _TZ.size)
+        return City(self._string(offset, length).decode("utf-8"), country.decode("ascii").strip(),
+                    round(lat, 5), round(lon, 5), self._string(tz_offset, tz_length).decode("utf-8"), population)
+
+    def lookup(self, name):
+        """Most populous city called name, or None"""
+        key = normalize(name).encode("utf-8")
+        mask = self._n_slots - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            (entry,) = _SLOT.unpack_from(self._mm, self._slots_at + slot * _SLOT.size)
+            if not entry:
+                return None
+            found, city = self._key(entry - 1)
+            if found == key:
+                return self._city(city)
+            slot = (slot + 1) & mask
+
+    def search(self, prefix, limit=10):
+        """Cities whose name starts with prefix, most populous first.
+
+        Every matching key is considered. Cities are stored by population, so
+        the answer is the lowest city numbers in the range, read in one pass
+        over the packed key records without touching the city table.
+        """
+        prefix = normalize(prefix).encode("utf-8")
+        if not prefix:
+            return []
+        keys = _KeyView(self)
+        start = bisect.bisect_left(keys, prefix)
+        # 0xff never occurs in UTF-8, so this sorts after every key starting with prefix
+        end = bisect.bisect_left(keys, prefix + b"\xff", start)
+        records = self._mm[self._keys_at + start * _KEY.size:self._keys_at + end * _KEY.size]
+        top = heapq.nsmallest(limit, {city for _, _, city in _KEY.iter_unpack(records)})
+        return [self._city(city) for city in top]
+
+
+class _KeyView:
+    """Sequence of the sorted key bytes, for bisect"""
+
+    def __init__(self, gazetteer):
+        self.gazetteer = gazetteer
+
+    def __len__(self):
+        return self.gazetteer._n_keys
+
+    def __getitem__(self, index):
+        return self.gazetteer._key(index)[0]
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Process-wide gazetteer; the index is (re)built from GAZETTEER_SOURCE when missing, stale or outdated"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            if (not os.path.exists(GAZETTEER_INDEX)
+                    or os.path.getmtime(GAZETTEER_INDEX) < os.path.getmtime(GAZETTEER_SOURCE)):
+                build_index()
+            try:
+                _default = Gazetteer(GAZETTEER_INDEX)
+            except ValueError:  # written by an older version of the index format
+                build_index()
+                _default = Gazetteer(GAZETTEER_INDEX)
+        return _default
+
+
+def lookup(name):
+    return get_gazetteer().lookup(name) if name else None
+
+
+def search(prefix, limit=10):
+    return get_gazetteer().search(prefix, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the offline city index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a GeoNames cities dump into the index")
+    build.add_argument("source", nargs="?", default=GAZETTEER_SOURCE)
+    build.add_argument("index", nargs="?", default=GAZETTEER_INDEX)
+    query = commands.add_parser("search", help="prefix search, most populous first")
+    query.add_argument("prefix")
+    query.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"{build_index(args.source, args.index)} cities indexed into {args.index}", file=sys.stderr)
+    else:
+        for city in search(args.prefix, args.limit):
+            print(f"{city.name}, {city.country}\t{city.lat}, {city.lon}\t{city.timezone}")
@@ -0,0 +1,135 @@
+# itinerary.py
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+Day = namedtuple("Day", "number theme attraction food tip")
+
+# JSON schema requested from the model in structured mode
+SCHEMA = {
+    "type": "object",
+    "required": ["intro", "days"],
+    "properties": {
+        "intro": {"type": "string"},
+        "days": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["day", "theme", "attraction", "food", "tip"],
+                "properties": {
+                    "day": {"type": "integer"},
+                    "theme": {"type": "string"},
+                    "attraction": {"type": "string"},
+                    "food": {"type": "string"},
+                    "tip": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+DAY_SCHEMA = SCHEMA["properties"]["days"]["items"]
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+class Itinerary:
+    """Typed itinerary: an intro and one Day per day.
+
+    When the model's reply is not valid structured output, days is empty and
+    the reply is kept as markdown, so callers can always fall back to it.
+    """
+
+    __slots__ = ("intro", "days", "markdown")
+
+    def __init__(self, intro="", days=(), markdown=None):
+        self.intro = intro
+        self.days = tuple(days)
+        self.markdown = markdown
+
+    @property
+    def structured(self):
+        return bool(self.days)
+
+    def to_json(self):
+        return json.dumps({"intro": self.intro, "days": [
+            {"day": d.number, "theme": d.theme, "attraction": d.attraction, "food": d.food, "tip": d.tip}
+            for d in self.days
+        ]}, ensure_ascii=False)
+
+    def to_markdown(self):
+        if not self.structured:
+            return self.markdown or ""
+        parts = [self.intro] if self.intro else []
+        parts.extend(day_markdown(day) for day in self.days)
+        return "\n\n".join(parts)
+
+    def replace_day(self, day):
+        return Itinerary(self.intro, [day if d.number == day.number else d for d in self.days])
+
+
+def day_markdown(day):
+    lines = [f"**Day {day.number}: {day.theme}**", ""]
+    if day.attraction:
+        lines.append(f"- {day.attraction}")
+    if day.food:
+        lines.append(f"- 🍽️ {day.food}")
+    if day.tip:
+        lines.append(f"- `{day.tip}`")
+    return "\n".join(lines)
+
+
+def _loads(text):
+    try:
+        return json.loads(_FENCE.sub("", text))
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ""
+
+
+def parse_day(value, number, theme=""):
+    """Day from a decoded day object (or its JSON text); None if it is not one"""
+    if isinstance(value, str):
+        value = _loads(value)
+    if not isinstance(value, dict) or not (_text(value.get("theme")) or _text(value.get("attraction"))):
+        return None
+    return Day(number, _text(value.get("theme")) or theme, _text(value.get("attraction")),
+               _text(value.get("food")), _text(value.get("tip")))
+
+
+def _numbered(value, number):
+    """Whether a day object carries the right day number (or none at all)"""
+    if not isinstance(value, dict) or value.get("day") is None:
+        return True
+    try:
+        return int(value["day"]) == number
+    except (TypeError, ValueError):
+        return False
+
+
+@lru_cache(maxsize=256)
+def parse_itinerary(text, days=None):
+    """Validated Itinerary from the model's reply, falling back to markdown when it is not structured.
+
+    Days must be numbered 1 to n in order and, when days is given, n must equal
+    it. A reply that fails only those checks is kept as markdown of its readable days.
+    """
+    value = _loads(text)
+    if not isinstance(value, dict) or not isinstance(value.get("days"), list):
+        return Itinerary(markdown=text)
+    intro = _text(value.get("intro"))
+    parsed = [parse_day(day, n) for n, day in enumerate(value["days"], 1)]
+    readable = [day for day in parsed if day is not None]
+    if (parsed and len(readable) == len(parsed) and (days is None or len(parsed) == days)
+            and all(_numbered(day, n) for n, day in enumerate(value["days"], 1))):
+        return Itinerary(intro, parsed)
+    return Itinerary(markdown=Itinerary(intro, readable).to_markdown() if readable else text)
+
+
+@lru_cache(maxsize=256)
+def itinerary_markdown(text):
+    """Markdown export of a stored itinerary, built the first time it is asked for"""
+    return parse_itinerary(text).to_markdown()
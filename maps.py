@@ -0,0 +1,53 @@
+# maps.py
+import hashlib
+import os
+from functools import lru_cache
+
+from gazetteer import lookup
+from startup import lazy_import
+
+# Rendered maps kept per process; each is a self-contained HTML page of a few tens of KB
+MAP_CACHE_SIZE = int(os.getenv("MAP_CACHE_SIZE", 128))
+
+ATTRACTIONS = ["Museum", "Restaurant", "Park", "Shopping"]
+
+
+def _offset(*identity):
+    """Stable pseudo-random (dlat, dlon) in [-0.5, 0.5) derived from identity"""
+    digest = hashlib.sha256("|".join(map(str, identity)).encode()).digest()
+    return (int.from_bytes(digest[:4], "big") / 2 ** 32 - 0.5,
+            int.from_bytes(digest[4:8], "big") / 2 ** 32 - 0.5)
+
+
+@lru_cache(maxsize=MAP_CACHE_SIZE)
+def map_html(destination, hotel_names):
+    """HTML for the destination map with hotel and attraction markers.
+
+    Marker positions only depend on the destination and hotel names, so the
+    same trip always renders the same map and the result can be cached.
+    hotel_names must be a tuple.
+    """
+    folium = lazy_import("folium")
+    city = lookup(destination)
+    lat, lon = (city.lat, city.lon) if city else (0, 0)
+
+    m = folium.Map(location=[lat, lon], zoom_start=12)
+    folium.Marker([lat, lon], popup=destination, icon=folium.Icon(color="pink", icon="star")).add_to(m)
+
+    # Hotels are placed around the center
+    for name in hotel_names:
+        dlat, dlon = _offset(destination, "hotel", name)
+        folium.Marker([lat + dlat * 0.02, lon + dlon * 0.02], popup=name,
+                      icon=folium.Icon(color="blue", icon="home")).add_to(m)
+
+    for attraction in ATTRACTIONS:
+        dlat, dlon = _offset(destination, "attraction", attraction)
+        folium.Marker([lat + dlat * 0.03, lon + dlon * 0.03], popup=attraction,
+                      icon=folium.Icon(color="green", icon="info-sign")).add_to(m)
+
+    return folium.Figure().add_child(m).render()
+
+
+def map_cache_stats():
+    info = map_html.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize, "max_entries": info.maxsize}
@@ -0,0 +1,121 @@
+# offers.py
+import os
+import re
+
+from cards import hotel_price
+
+OFFERS_PAGE_SIZE = int(os.getenv("OFFERS_PAGE_SIZE", 10))
+
+# Views kept per result set; each is a list of positions, so this stays small
+MAX_VIEWS = 32
+
+
+def parse_amount(value):
+    """1200.0 from "$1,200", "1200" or 1200; None if there is no number"""
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", str(value))
+    return float(match.group(0).replace(",", "")) if match else None
+
+
+def parse_minutes(value):
+    """150 from "2h 30m" """
+    hours = re.search(r"(\d+)\s*h", str(value))
+    minutes = re.search(r"(\d+)\s*m", str(value))
+    return (int(hours.group(1)) * 60 if hours else 0) + (int(minutes.group(1)) if minutes else 0)
+
+
+def parse_stops(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0 if str(value).strip().lower() in ("direct", "nonstop", "non-stop", "") else 1
+
+
+def _price_or_last(value):
+    amount = parse_amount(value)
+    return float("inf") if amount is None else amount
+
+
+# Per kind: the sortable columns, extracted once per result set
+COLUMNS = {
+    "flights": {
+        "price": lambda f: _price_or_last(f.get("price")),
+        "departure": lambda f: str(f.get("departure_time", "")),
+        "duration": lambda f: parse_minutes(f.get("duration", "")),
+        "stops": lambda f: parse_stops(f.get("stops", 0)),
+    },
+    "hotels": {
+        "price": lambda h: _price_or_last(hotel_price(h)),
+        "name": lambda h: str(h.get("name", "")).casefold(),
+    },
+    "car_rentals": {
+        "price": lambda c: _price_or_last(c.get("price_per_day")),
+        "seats": lambda c: int(c.get("seats") or 0),
+    },
+}
+
+# Sort label -> (column, descending)
+SORTS = {
+    "flights": {
+        "Lowest price": ("price", False),
+        "Earliest departure": ("departure", False),
+        "Shortest flight": ("duration", False),
+        "Fewest stops": ("stops", False),
+    },
+    "hotels": {
+        "Lowest price": ("price", False),
+        "Highest price": ("price", True),
+        "Name": ("name", False),
+    },
+    "car_rentals": {
+        "Lowest price": ("price", False),
+        "Most seats": ("seats", True),
+    },
+}
+
+
+class OfferIndex:
+    """Sort keys and orderings for one result set, computed once.
+
+    Sorting, filtering and paging only re-slice lists of positions into
+    items, so changing them never re-fetches or re-parses the offers.
+    """
+
+    def __init__(self, kind, items):
+        self.kind = kind
+        self.items = items
+        self.columns = {name: [key(item) for item in items] for name, key in COLUMNS[kind].items()}
+        self._orders = {}
+        self._views = {}
+
+    def sort_options(self):
+        return list(SORTS[self.kind])
+
+    def price_range(self):
+        prices = [p for p in self.columns["price"] if p != float("inf")]
+        return (int(min(prices)), int(max(prices)) + 1) if prices else None
+
+    def _order(self, column, descending):
+        key = (column, descending)
+        if key not in self._orders:
+            values = self.columns[column]
+            self._orders[key] = sorted(range(len(values)), key=values.__getitem__, reverse=descending)
+        return self._orders[key]
+
+    def view(self, sort, max_price=None, direct_only=False):
+        """Positions of the matching items in sort order"""
+        key = (sort, max_price, direct_only)
+        if key not in self._views:
+            if len(self._views) >= MAX_VIEWS:
+                self._views.clear()
+            order = self._order(*SORTS[self.kind][sort])
+            prices = self.columns["price"]
+            stops = self.columns.get("stops")
+            self._views[key] = [
+                i for i in order
+                if (max_price is None or prices[i] <= max_price) and not (direct_only and stops and stops[i])
+            ]
+        return self._views[key]
+
+    def page(self, view, number, page_size=OFFERS_PAGE_SIZE):
+        """Items on page number (0-based) of view"""
+        return [self.items[i] for i in view[number * page_size:(number + 1) * page_size]]
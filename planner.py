@@ -0,0 +1,213 @@
+# planner.py
+import datetime
+import logging
+import os
+import time
+
+from ai_itinerary import generate_itinerary_cached, itinerary_cache_stats, stream_itinerary_cached
+from mock_data import generate_mock_flights, generate_mock_car_rentals
+from fanout import Source, fan_out
+from gazetteer import lookup
+from breaker import get_breaker, health_snapshot
+from prompts import prompt_stats
+from startup import import_report
+from warmup import record_trip
+
+logger = logging.getLogger(__name__)
+
+# Fallback function when scraper fails
+def fallback_hotels(destination, check_in, check_out):
+    """Generate backup hotel data if the scraper fails"""
+    hotels = []
+    hotel_names = {
+        "Paris": ["Grand Hôtel de Paris", "Le Marais Suites", "Eiffel View Residence"],
+        "Tokyo": ["Shinjuku Plaza Hotel", "Tokyo Bay Resort", "Imperial Garden Inn"],
+        "New York": ["Manhattan Skyline Hotel", "Broadway Comfort Inn", "Central Park Lodge"],
+        "Dubai": ["Palm Luxury Resort", "Desert Oasis Hotel", "Marina View Suites"]
+    }
+    
+    descriptions = [
+        f"Experience the heart of {destination} at this centrally located hotel with modern amenities and exceptional service.",
+        f"Situated in the most vibrant district of {destination}, this hotel offers comfort and convenience for all travelers.",
+        f"Luxury accommodations with stunning views of {destination}'s most iconic landmarks."
+    ]
+    
+    city = lookup(destination)
+    place = city.name if city else destination
+    names = hotel_names.get(place, [f"{place} Luxury Hotel", f"{place} City Center Inn", f"{place} Plaza Resort"])
+    
+    for i in range(min(3, len(names))):
+        hotels.append({
+            "name": names[i],
+            "description": descriptions[i % len(descriptions)],
+            "url": f"https://example.com/hotels/{destination.lower().replace(' ', '-')}/{i+1}"
+        })
+    return hotels
+
+# Fallback function for flights
+def fallback_flights(origin, destination, departure_date, return_date):
+    """Generate backup flight data if the scraper fails"""
+    return generate_mock_flights(origin, destination, departure_date, return_date)
+
+# Fallback function for car rentals
+def fallback_car_rentals(location, start_date, end_date):
+    """Generate backup car rental data if the scraper fails"""
+    return generate_mock_car_rentals(location, start_date, end_date)
+
+# Circuit breakers shared by every session in the process. An open breaker sends
+# the source straight to its fallback instead of paying for another failure.
+hotel_breaker = get_breaker("hotels", slow_call=15.0)
+flight_breaker = get_breaker("flights")
+car_rental_breaker = get_breaker("car_rentals")
+
+# Safe scraper function that falls back to mock data
+def safe_scrape_hotels(destination, check_in, check_out, warn=None):
+    """Attempt to scrape hotels, fallback to mock data if fails"""
+    if not hotel_breaker.allow():
+        return fallback_hotels(destination, check_in, check_out)
+    started = time.monotonic()
+    try:
+        from scraper import scrape_hotels
+        results = scrape_hotels(destination, check_in, check_out)
+        # A detail page that could not be fetched comes back as an "Error" record
+        hotels = [hotel for hotel in results or [] if hotel.get("name") != "Error"]
+        if not hotels:
+            error = results[0]["description"] if results else "no results"
+            hotel_breaker.record(False, time.monotonic() - started, error)
+            return fallback_hotels(destination, check_in, check_out)
+        hotel_breaker.record(True, time.monotonic() - started)
+        return hotels
+    except Exception as e:
+        hotel_breaker.record(False, time.monotonic() - started, str(e))
+        (warn or logger.warning)(f"Hotel data couldn't be scraped: {str(e)}. Using simulated data instead.")
+        return fallback_hotels(destination, check_in, check_out)
+    
+# New function for scraping flights
+def safe_scrape_flights(origin, destination, departure_date, return_date, warn=None):
+    """Attempt to scrape flights, fallback to mock data if fails"""
+    if not flight_breaker.allow():
+        return fallback_flights(origin, destination, departure_date, return_date)
+    started = time.monotonic()
+    try:
+        from scraper import scrape_flights
+        results = scrape_flights(origin, destination, departure_date, return_date)
+        if not results or len(results) == 0:
+            flight_breaker.record(False, time.monotonic() - started, "no results")
+            return fallback_flights(origin, destination, departure_date, return_date)
+        flight_breaker.record(True, time.monotonic() - started)
+        return results
+    except Exception as e:
+        flight_breaker.record(False, time.monotonic() - started, str(e))
+        (warn or logger.warning)(f"Flight data couldn't be scraped: {str(e)}. Using simulated data instead.")
+        return fallback_flights(origin, destination, departure_date, return_date)
+
+# New function for scraping car rentals
+def safe_scrape_car_rentals(location, start_date, end_date, warn=None):
+    """Attempt to scrape car rentals, fallback to mock data if fails"""
+    if not car_rental_breaker.allow():
+        return fallback_car_rentals(location, start_date, end_date)
+    started = time.monotonic()
+    try:
+        from scraper import scrape_car_rentals
+        results = scrape_car_rentals(location, start_date, end_date)
+        if not results or len(results) == 0:
+            car_rental_breaker.record(False, time.monotonic() - started, "no results")
+            return fallback_car_rentals(location, start_date, end_date)
+        car_rental_breaker.record(True, time.monotonic() - started)
+        return results
+    except Exception as e:
+        car_rental_breaker.record(False, time.monotonic() - started, str(e))
+        (warn or logger.warning)(f"Car rental data couldn't be scraped: {str(e)}. Using simulated data instead.")
+        return fallback_car_rentals(location, start_date, end_date)
+
+# -------------------- PLANNING ENGINE --------------------
+# Per-source deadlines (seconds) for the concurrent fan-out in start_plan
+SOURCE_DEADLINES = {
+    "itinerary": float(os.getenv("ITINERARY_DEADLINE", 60)),
+    "flights": float(os.getenv("FLIGHTS_DEADLINE", 5)),
+    "car_rentals": float(os.getenv("CAR_RENTALS_DEADLINE", 5)),
+    "hotels": float(os.getenv("HOTELS_DEADLINE", 20)),
+}
+SOURCE_LABELS = {
+    "itinerary": "Itinerary",
+    "flights": "Flight data",
+    "car_rentals": "Car rental data",
+    "hotels": "Hotel data",
+}
+
+def parse_form_data(data):
+    """Copy of form_data with ISO date strings (as sent over JSON) turned into dates"""
+    data = dict(data, activities=list(data.get("activities") or []))
+    for field in ("start_date", "end_date"):
+        if isinstance(data.get(field), str):
+            data[field] = datetime.date.fromisoformat(data[field])
+    data["trip_length"] = int(data.get("trip_length") or (data["end_date"] - data["start_date"]).days)
+    return data
+
+class PlanHandle:
+    """A plan being computed; result() waits for every source up to its deadline"""
+
+    def __init__(self, fanout, notes):
+        self.fanout = fanout
+        self.notes = notes
+
+    def result(self):
+        plan = dict(self.fanout.result())
+        warnings = list(self.notes)
+        for name, info in self.fanout.report.items():
+            if info["status"] == "timeout" and name == "itinerary":
+                warnings.append(f"Your itinerary took longer than {SOURCE_DEADLINES[name]:.0f}s. Please try again in a moment.")
+            elif info["status"] == "timeout":
+                warnings.append(f"{SOURCE_LABELS[name]} took longer than {SOURCE_DEADLINES[name]:.0f}s. Using simulated data instead.")
+            elif info["status"] == "error" and name == "itinerary":
+                warnings.append(f"Your itinerary couldn't be generated: {info['error']}. Please try again in a moment.")
+            elif info["status"] == "error":
+                warnings.append(f"{SOURCE_LABELS[name]} couldn't be loaded: {info['error']}. Using simulated data instead.")
+        plan["warnings"] = warnings
+        plan["report"] = self.fanout.report
+        return plan
+
+def start_plan(form_data, include_itinerary=True):
+    """Start fetching flights, hotels, car rentals and (optionally) the itinerary concurrently"""
+    data = parse_form_data(form_data)
+    notes = []
+    sources = [
+        Source("flights",
+               lambda: generate_mock_flights(data["origin"], data["destination"], data["start_date"], data["end_date"]),
+               lambda: fallback_flights(data["origin"], data["destination"], data["start_date"], data["end_date"]),
+               SOURCE_DEADLINES["flights"]),
+        Source("car_rentals",
+               lambda: generate_mock_car_rentals(data["destination"], data["start_date"], data["end_date"]),
+               lambda: fallback_car_rentals(data["destination"], data["start_date"], data["end_date"]),
+               SOURCE_DEADLINES["car_rentals"]),
+        Source("hotels",
+               lambda: safe_scrape_hotels(data["destination"], data["start_date"], data["end_date"], warn=notes.append),
+               lambda: fallback_hotels(data["destination"], data["start_date"], data["end_date"]),
+               SOURCE_DEADLINES["hotels"]),
+    ]
+    if include_itinerary:
+        record_trip(data)
+        sources.append(Source(
+            "itinerary",
+            lambda: generate_itinerary_cached(data),
+            # No itinerary rather than an error sentence in its place; the reason is in warnings
+            lambda: "",
+            SOURCE_DEADLINES["itinerary"]))
+    return PlanHandle(fan_out(sources), notes)
+
+def plan_trip(form_data, include_itinerary=True):
+    """Blocking plan: {"itinerary", "flights", "hotels", "car_rentals", "warnings", "report"}.
+
+    A failed itinerary is "" and explained in warnings; report["itinerary"] says why.
+    """
+    return start_plan(form_data, include_itinerary).result()
+
+def stream_itinerary(form_data):
+    """Itinerary text chunks as they are generated"""
+    data = parse_form_data(form_data)
+    record_trip(data)
+    return stream_itinerary_cached(data)
+
+def health():
+    return {"status": "ok", "sources": health_snapshot(), "prompts": prompt_stats(),
+            "itinerary_cache": itinerary_cache_stats(), "imports": import_report()}
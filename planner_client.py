@@ -0,0 +1,90 @@
+# planner_client.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from ai_itinerary import ItineraryRateLimited, ItineraryUnavailable
+
+# Base URL of a running service.py (e.g. http://127.0.0.1:8600). Unset runs the engine in-process.
+PLANNER_URL = os.getenv("PLANNER_URL", "").rstrip("/")
+PLANNER_TIMEOUT = float(os.getenv("PLANNER_TIMEOUT", 90))
+
+_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="planner-client")
+
+
+class RemotePlanner:
+    """HTTP client for service.py with the same interface as the planner module"""
+
+    def __init__(self, base_url, timeout=PLANNER_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path, payload, **kwargs):
+        res = self.session.post(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload, default=str),
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout,
+            **kwargs,
+        )
+        res.raise_for_status()
+        return res
+
+    def plan_trip(self, form_data, include_itinerary=True):
+        try:
+            return self._post("/v1/plan", {"form_data": form_data, "include_itinerary": include_itinerary}).json()
+        except requests.HTTPError as e:
+            # A failed itinerary still comes with the rest of the plan, like the local engine returns it
+            if e.response is not None and e.response.status_code in (429, 503):
+                try:
+                    plan = e.response.json()
+                except ValueError:
+                    raise e
+                if "warnings" in plan:
+                    return plan
+            raise
+
+    def start_plan(self, form_data, include_itinerary=True):
+        # A Future has the same result() as planner.PlanHandle
+        return _pool.submit(self.plan_trip, form_data, include_itinerary)
+
+    def stream_itinerary(self, form_data):
+        """Itinerary chunks from the service; failures raise ItineraryError like the local engine"""
+        try:
+            res = self._post("/v1/itinerary/stream", {"form_data": form_data}, stream=True)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                raise ItineraryRateLimited(str(e)) from e
+            raise ItineraryUnavailable(str(e)) from e
+        except requests.RequestException as e:
+            raise ItineraryUnavailable(str(e)) from e
+        with res:
+            res.encoding = "utf-8"
+            try:
+                for chunk in res.iter_content(chunk_size=None, decode_unicode=True):
+                    if chunk:
+                        yield chunk
+            except requests.RequestException as e:
+                raise ItineraryUnavailable(f"itinerary stream interrupted: {e}") from e
+
+    def health(self):
+        res = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()
+
+
+_remote = None
+
+
+def get_planner():
+    """The planning engine to use: the HTTP service when PLANNER_URL is set, else in-process"""
+    global _remote
+    if not PLANNER_URL:
+        import planner
+        return planner
+    if _remote is None:
+        _remote = RemotePlanner(PLANNER_URL)
+    return _remote
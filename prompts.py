@@ -0,0 +1,197 @@
+# prompts.py
+import logging
+import string
+import threading
+from collections import deque
+
+from itinerary import DAY_SCHEMA, SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Recent requests kept per template for the size distribution
+HISTORY = 500
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class Prompt:
+    """A rendered prompt: static preamble (sent as the system message) and per-request message.
+
+    schema, when set, is the JSON schema the reply must follow.
+    """
+
+    __slots__ = ("template", "preamble", "message", "schema")
+
+    def __init__(self, template, preamble, message, schema=None):
+        self.template = template
+        self.preamble = preamble
+        self.message = message
+        self.schema = schema
+
+    def estimated_tokens(self):
+        return estimate_tokens(self.preamble) + estimate_tokens(self.message)
+
+    def __str__(self):
+        return f"{self.preamble}\n\n{self.message}"
+
+
+class PromptTemplate:
+    """Static instructions plus a compact message template, parsed once at import.
+
+    Only flat {name} / {name:spec} fields are supported in the message.
+    """
+
+    def __init__(self, name, preamble, message, schema=None):
+        self.name = name
+        self.preamble = preamble.strip()
+        self.schema = schema
+        self._parts = [
+            (literal, field, spec)
+            for literal, field, spec, _ in string.Formatter().parse(message.strip())
+        ]
+
+    def render(self, **fields):
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(fields[field], spec or ""))
+        return Prompt(self.name, self.preamble, "".join(out), self.schema)
+
+
+def trip_payload(data):
+    """Compact one-line description of a trip for the per-request message"""
+    interests = ", ".join(data["activities"]) if data["activities"] else "general"
+    return (f"to {data['destination']}; "
+            f"{data['trip_length']} days, {data['start_date']} to {data['end_date']}; "
+            f"budget {data['budget']}; transport {data['transportation']}; interests {interests}")
+
+
+ITINERARY_TEMPLATE = PromptTemplate("itinerary", preamble="""
+You are an expert travel assistant creating professional, well-structured travel itineraries.
+
+### Output Requirements:
+1. **Introduction:** Brief, engaging paragraph about the destination (50-60 words max)
+2. **Daily Structure:** Each day should follow this consistent format (100-120 words per day):
+   - **Day X: [Theme/Area]**
+   - Main attraction or activity with brief description
+   - One food recommendation (restaurant name or local specialty)
+   - Practical tip or cultural insight using `code` formatting naturally
+3. **Formatting Standards:**
+   - Use **bold** for day headers and key attractions
+   - Use `code` for practical tips, booking advice, or local insights
+   - Keep structure consistent across all days
+4. **Professional Guidelines:**
+   - Include realistic travel times between locations
+   - Mention advance booking requirements where relevant
+   - Suggest budget-appropriate options when possible
+   - For longer trips (4+ days), group similar activities or highlight key days
+   - Ensure geographical accuracy - only suggest day trips within reasonable distance
+
+### Quality Standards:
+- Write naturally and professionally
+- Avoid tourist clichés and generic descriptions
+- Include actionable, specific recommendations
+- Maintain consistent tone throughout
+- Focus on practical value for travelers
+""", message="""
+Trip: {trip}
+Generate the complete itinerary following the guidelines exactly.
+""")
+
+OUTLINE_TEMPLATE = PromptTemplate("outline", preamble="""
+You are an expert travel assistant planning the shape of a trip before it is written in detail.
+Reply with plain lines and nothing else:
+Intro: <engaging introduction to the destination, 50-60 words>
+Day N: <theme or area for the day, max 8 words>   (one line per day, in order)
+Group nearby areas on the same day, keep day trips within reasonable distance and avoid repeating themes.
+""", message="""
+Trip: {trip}
+Reply with the Intro line and Day 1 to Day {days}.
+""")
+
+DAY_TEMPLATE = PromptTemplate("day", preamble="""
+You are an expert travel assistant writing a single day of an itinerary, 100-120 words, in this format:
+- **Day X: [Theme]** as the header
+- Main attraction or activity with brief description
+- One food recommendation (restaurant name or local specialty)
+- Practical tip or cultural insight using `code` formatting naturally
+Use **bold** for key attractions, include realistic travel times and advance booking requirements where relevant,
+and suggest options that fit the budget. Do not write an introduction or any other day.
+""", message="""
+Trip: {trip}
+Plan:
+{plan}
+Write only Day {day}: {theme}
+""")
+
+STRUCTURED_TEMPLATE = PromptTemplate("itinerary_json", preamble="""
+You are an expert travel assistant creating professional, well-structured travel itineraries.
+Reply with a single JSON object and nothing else:
+{"intro": "<engaging introduction to the destination, 50-60 words>",
+ "days": [{"day": 1, "theme": "<theme or area, max 8 words>", "attraction": "<main attraction or activity with a brief
+ description and realistic travel times>", "food": "<one restaurant name or local specialty>",
+ "tip": "<practical tip, booking advice or cultural insight>"}, ...]}
+Write one entry per day, in order. Use **bold** for key attractions inside the strings, mention advance booking
+requirements where relevant, suggest budget-appropriate options, keep day trips within reasonable distance,
+and avoid tourist cliches and generic descriptions.
+""", message="""
+Trip: {trip}
+Reply with the intro and days 1 to {days} as JSON.
+""", schema=SCHEMA)
+
+DAY_JSON_TEMPLATE = PromptTemplate("day_json", preamble="""
+You are an expert travel assistant writing a single day of an itinerary.
+Reply with a single JSON object and nothing else:
+{"day": <number>, "theme": "<theme>", "attraction": "<main attraction or activity with a brief description>",
+ "food": "<one restaurant name or local specialty>", "tip": "<practical tip or cultural insight>"}
+Use **bold** for key attractions, include realistic travel times and advance booking requirements where relevant,
+and suggest options that fit the budget.
+""", message="""
+Trip: {trip}
+Plan:
+{plan}
+Write only Day {day}: {theme}
+""", schema=DAY_SCHEMA)
+
+
+# -------------------- TOKEN ACCOUNTING --------------------
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def record_usage(prompt, input_tokens, output_tokens):
+    """Record one request's token counts; estimates are used when billing info is missing"""
+    name = prompt.template if isinstance(prompt, Prompt) else "raw"
+    estimated = not input_tokens
+    if estimated:
+        input_tokens = prompt.estimated_tokens() if isinstance(prompt, Prompt) else estimate_tokens(str(prompt))
+    with _stats_lock:
+        stats = _stats.setdefault(name, {"requests": 0, "input_tokens": 0, "output_tokens": 0,
+                                         "sizes": deque(maxlen=HISTORY)})
+        stats["requests"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        stats["sizes"].append(input_tokens)
+    logger.info("prompt %s: %d input tokens%s, %d output tokens",
+                name, input_tokens, " (estimated)" if estimated else "", output_tokens)
+
+
+def _percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else None
+
+
+def prompt_stats():
+    """Per template: request count, token totals and input-size distribution of recent requests"""
+    with _stats_lock:
+        snapshot = {name: dict(stats, sizes=sorted(stats["sizes"])) for name, stats in _stats.items()}
+    report = {}
+    for name, stats in snapshot.items():
+        sizes = stats.pop("sizes")
+        stats["input_p50"] = _percentile(sizes, 0.5)
+        stats["input_p90"] = _percentile(sizes, 0.9)
+        stats["input_max"] = sizes[-1] if sizes else None
+        report[name] = stats
+    return report
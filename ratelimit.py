@@ -0,0 +1,261 @@
+# ratelimit.py
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimitTimeout(Exception):
+    """The limiter could not grant capacity within the caller's max wait"""
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` tokens per second"""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount tokens are available (0 if they are now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Process-wide limiter on requests/min and tokens/min.
+
+    acquire() queues the caller until both buckets have capacity, up to
+    max_wait seconds, then raises RateLimitTimeout. 0 disables a limit.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+        self.cond = threading.Condition()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.granted = 0
+
+    def _wait_time(self, tokens, now):
+        wait = max(0.0, self.paused_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _try_take(self, tokens, deadline, max_wait):
+        """Take capacity and return 0, or return how long to wait; caller holds cond"""
+        now = time.monotonic()
+        wait = self._wait_time(tokens, now)
+        if wait <= 0:
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            self.granted += 1
+            return 0.0
+        if now + wait > deadline:
+            raise RateLimitTimeout(f"rate limit: no capacity within {max_wait:g}s")
+        return wait
+
+    def acquire(self, tokens=0, max_wait=30.0):
+        deadline = time.monotonic() + max_wait
+        with self.cond:
+            self.waiting += 1
+            try:
+                while True:
+                    wait = self._try_take(tokens, deadline, max_wait)
+                    if not wait:
+                        return
+                    self.cond.wait(wait)
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self, tokens=0, max_wait=30.0):
+        """acquire() for coroutines: waits with asyncio.sleep instead of blocking the loop"""
+        deadline = time.monotonic() + max_wait
+        with self.cond:
+            self.waiting += 1
+        try:
+            while True:
+                with self.cond:
+                    wait = self._try_take(tokens, deadline, max_wait)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            with self.cond:
+                self.waiting -= 1
+
+    def settle(self, reserved, used):
+        """Return tokens reserved by acquire() but not actually used"""
+        if self.tokens and used < reserved:
+            with self.cond:
+                self.tokens.give(reserved - used)
+                self.cond.notify_all()
+
+    def pause(self, seconds):
+        """Hold every caller for `seconds`, e.g. after the server sent Retry-After"""
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self.cond:
+            return {"waiting": self.waiting, "granted": self.granted,
+                    "paused_for": max(0.0, self.paused_until - time.monotonic())}
+
+
+class BackgroundLimiter:
+    """Lower-priority budget layered on a shared RateLimiter.
+
+    Callers take from their own, smaller budget first, then from the shared
+    limiter only while nobody is queued on it and `headroom` requests are
+    left, so live traffic never waits behind background work. Background
+    work is not latency-sensitive: it waits up to its own max_wait whatever
+    the caller asks for.
+    """
+
+    def __init__(self, shared, requests_per_minute, headroom=1, max_wait=600.0):
+        self.shared = shared
+        self.own = RateLimiter(requests_per_minute)
+        self.headroom = headroom
+        self.max_wait = max_wait
+        self.deferred = 0
+
+    def _try_shared(self, tokens, deadline):
+        """Take from the shared limiter if it has room to spare, else return how long to wait"""
+        shared = self.shared
+        with shared.cond:
+            now = time.monotonic()
+            wait = max(0.0, shared.paused_until - now)
+            if shared.requests:
+                wait = max(wait, shared.requests.wait_time(1 + self.headroom, now))
+            if shared.tokens:
+                wait = max(wait, shared.tokens.wait_time(tokens, now))
+            if shared.waiting:
+                wait = max(wait, 1.0)
+            if wait <= 0:
+                if shared.requests:
+                    shared.requests.take(1)
+                if shared.tokens:
+                    shared.tokens.take(tokens)
+                shared.granted += 1
+                return 0.0
+            self.deferred += 1
+        if now + wait > deadline:
+            raise RateLimitTimeout(f"rate limit: no spare capacity for background work within {self.max_wait:g}s")
+        return wait
+
+    def acquire(self, tokens=0, max_wait=None):
+        deadline = time.monotonic() + self.max_wait
+        self.own.acquire(0, self.max_wait)
+        while True:
+            wait = self._try_shared(tokens, deadline)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=0, max_wait=None):
+        deadline = time.monotonic() + self.max_wait
+        await self.own.acquire_async(0, self.max_wait)
+        while True:
+            wait = self._try_shared(tokens, deadline)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def settle(self, reserved, used):
+        self.shared.settle(reserved, used)
+
+    def pause(self, seconds):
+        # A Retry-After applies to the API key, so it holds live and background callers alike
+        self.shared.pause(seconds)
+
+    def stats(self):
+        return dict(self.own.stats(), deferred=self.deferred)
+
+
+def status_code(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the error, if the server sent one"""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    if status_code(error) in RETRYABLE_STATUS:
+        return True
+    name = type(error).__name__.lower()
+    return "timeout" in name or "connection" in name
+
+
+def _backoff(error, attempt, limiter, base_delay, max_delay):
+    delay = retry_after(error)
+    if delay is not None:
+        if limiter:
+            limiter.pause(delay)
+        return delay
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retry(fn, limiter=None, tokens=0, retries=4, base_delay=1.0, max_delay=30.0, max_wait=30.0):
+    """Call fn() through limiter, retrying retryable errors.
+
+    Backoff is exponential with full jitter; a Retry-After from the server
+    overrides it and also pauses every other caller of the limiter.
+    """
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire(tokens, max_wait=max_wait)
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            time.sleep(_backoff(e, attempt, limiter, base_delay, max_delay))
+
+
+async def call_with_retry_async(fn, limiter=None, tokens=0, retries=4, base_delay=1.0, max_delay=30.0, max_wait=30.0):
+    """Coroutine counterpart of call_with_retry; fn() returns an awaitable"""
+    for attempt in range(retries + 1):
+        if limiter:
+            await limiter.acquire_async(tokens, max_wait=max_wait)
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            await asyncio.sleep(_backoff(e, attempt, limiter, base_delay, max_delay))
@@ -1,35 +1,319 @@
 # travel_scraper.py
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from bs4 import BeautifulSoup, SoupStrainer
 from duckduckgo_search import DDGS
 
+from cache import DiskCache, make_key
+from singleflight import SingleFlight
+
+REQUEST_TIMEOUT = 10
+# Overall budget for scrape_hotels (search + detail pages); whatever finished in time is returned
+SCRAPE_DEADLINE = float(os.getenv("SCRAPER_DEADLINE", 12))
+FETCH_WORKERS = int(os.getenv("SCRAPER_FETCH_WORKERS", 8))
+PER_HOST_CONNECTIONS = int(os.getenv("SCRAPER_PER_HOST_CONNECTIONS", 4))
+# Only the <head> of a hotel page is needed; stop reading there or at this many bytes
+MAX_HEAD_BYTES = int(os.getenv("SCRAPER_MAX_HEAD_BYTES", 512 * 1024))
+CHUNK_SIZE = 16 * 1024
+
+logger = logging.getLogger(__name__)
+
+_HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+_HEAD_TAGS = SoupStrainer(["title", "meta"])
+
+# Conditional-request cache for hotel pages. Freshness comes from Cache-Control
+# (or the default below); stale entries are served for up to the
+# stale-while-revalidate window while a background request revalidates them.
+PAGE_DEFAULT_MAX_AGE = int(os.getenv("SCRAPER_PAGE_MAX_AGE", 6 * 3600))
+PAGE_STALE_WHILE_REVALIDATE = int(os.getenv("SCRAPER_STALE_WHILE_REVALIDATE", 7 * 24 * 3600))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPER_PAGE_CACHE_MAX_ENTRIES", 5000))
+PAGE_CACHE_RETENTION = int(os.getenv("SCRAPER_PAGE_CACHE_RETENTION", 30 * 24 * 3600))
+
+page_cache = DiskCache("hotel_pages", ttl=PAGE_CACHE_RETENTION, max_entries=PAGE_CACHE_MAX_ENTRIES)
+
+# DDG search results per (destination, max_results). Empty or failed searches are
+# cached briefly too, so a rate-limited search is not retried on every request.
+SEARCH_CACHE_TTL = int(os.getenv("SCRAPER_SEARCH_TTL", 12 * 3600))
+SEARCH_NEGATIVE_TTL = int(os.getenv("SCRAPER_SEARCH_NEGATIVE_TTL", 300))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPER_SEARCH_CACHE_MAX_ENTRIES", 1000))
+
+search_cache = DiskCache("hotel_search", ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+search_flights = SingleFlight("hotel-search")
+hotel_flights = SingleFlight("hotels")
+
+_stats_lock = threading.Lock()
+_fetch_stats = {"fetches": 0, "early_stops": 0, "bytes_read": 0, "bytes_skipped": 0,
+                "seconds": 0.0, "seconds_saved": 0.0}
+_cache_stats = {"fresh_hits": 0, "stale_hits": 0, "not_modified": 0, "misses": 0, "bytes_saved": 0}
+_revalidating = set()
+
+_session = None
+_session_lock = threading.Lock()
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="scraper")
+
+def get_session():
+    """Process-wide keep-alive session; at most PER_HOST_CONNECTIONS sockets per host"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=PER_HOST_CONNECTIONS, pool_block=True)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({'User-Agent': 'Mozilla/5.0'})
+            _session = session
+        return _session
+
+def fetch_all(fn, items, deadline):
+    """Run fn over items on the shared fetch pool.
+
+    Returns the results that completed within deadline seconds, in input order.
+    Work that has not started by then is cancelled.
+    """
+    futures = [_fetch_pool.submit(fn, item) for item in items]
+    done, not_done = wait(futures, timeout=max(0.0, deadline))
+    for future in not_done:
+        future.cancel()
+    return [f.result() for f in futures if f in done and f.exception() is None]
+
+def fetch_stats():
+    """Totals for head-only fetches: bytes read vs skipped and estimated time saved"""
+    with _stats_lock:
+        return dict(_fetch_stats)
+
+def read_head(res, max_bytes=MAX_HEAD_BYTES):
+    """Read a streamed response up to </head> (or max_bytes) and close it.
+
+    Returns (head_bytes, wire_bytes_read, stopped_early).
+    """
+    buf = bytearray()
+    stopped_early = False
+    try:
+        for chunk in res.iter_content(chunk_size=CHUNK_SIZE):
+            # Search only the tail that could contain a new match
+            search_from = max(0, len(buf) - 16)
+            buf.extend(chunk)
+            match = _HEAD_END.search(buf, search_from)
+            if match:
+                del buf[match.end():]
+                stopped_early = True
+                break
+            if len(buf) >= max_bytes:
+                del buf[max_bytes:]
+                stopped_early = True
+                break
+        wire_bytes = res.raw.tell() if hasattr(res.raw, "tell") else len(buf)
+    finally:
+        res.close()
+    return bytes(buf), wire_bytes, stopped_early
+
+def _record_fetch(url, wire_bytes, total_bytes, elapsed, stopped_early):
+    skipped = max(0, total_bytes - wire_bytes) if total_bytes else 0
+    # Assume the rest of the body would have arrived at the rate observed so far
+    saved = elapsed * skipped / wire_bytes if wire_bytes else 0.0
+    with _stats_lock:
+        _fetch_stats["fetches"] += 1
+        _fetch_stats["early_stops"] += int(stopped_early)
+        _fetch_stats["bytes_read"] += wire_bytes
+        _fetch_stats["bytes_skipped"] += skipped
+        _fetch_stats["seconds"] += elapsed
+        _fetch_stats["seconds_saved"] += saved
+    logger.info("head fetch %s: read %d of %s bytes in %.2fs (saved ~%d bytes, ~%.2fs)",
+                url, wire_bytes, total_bytes or "?", elapsed, skipped, saved)
+
+def cache_stats():
+    """Hotel page cache counters for this process, including hit rate and bytes saved"""
+    with _stats_lock:
+        stats = dict(_cache_stats)
+    lookups = stats["fresh_hits"] + stats["stale_hits"] + stats["not_modified"] + stats["misses"]
+    hits = lookups - stats["misses"]
+    stats["hit_rate"] = hits / lookups if lookups else 0.0
+    return stats
+
+def _count(counter, amount=1):
+    with _stats_lock:
+        _cache_stats[counter] += amount
+
+def parse_cache_control(header):
+    """Parse a Cache-Control header into {directive: value or True}"""
+    directives = {}
+    for part in (header or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') if value else True
+    return directives
+
+def _freshness(headers, now):
+    """Return (fresh_until, stale_until) for a response, or None if it must not be stored"""
+    cc = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in cc or "private" in cc:
+        return None
+    if "no-cache" in cc:
+        max_age = 0
+    elif "s-maxage" in cc or "max-age" in cc:
+        try:
+            max_age = int(cc.get("s-maxage", cc.get("max-age")))
+        except ValueError:
+            max_age = 0
+    elif headers.get("Expires"):
+        try:
+            max_age = parsedate_to_datetime(headers["Expires"]).timestamp() - now
+        except (TypeError, ValueError):
+            max_age = 0
+    else:
+        max_age = PAGE_DEFAULT_MAX_AGE
+    try:
+        swr = int(cc.get("stale-while-revalidate", PAGE_STALE_WHILE_REVALIDATE))
+    except ValueError:
+        swr = PAGE_STALE_WHILE_REVALIDATE
+    if "must-revalidate" in cc or "no-cache" in cc:
+        swr = 0
+    fresh_until = now + max(0, max_age)
+    return fresh_until, fresh_until + swr
+
+def _store(url, record, headers, size):
+    now = time.time()
+    freshness = _freshness(headers, now)
+    if freshness is None:
+        page_cache.delete(url)
+        return
+    page_cache.set(url, {
+        "record": record,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "size": size,
+        "fresh_until": freshness[0],
+        "stale_until": freshness[1],
+    })
+
+def _search_live(destination, max_results):
+    with DDGS() as ddgs:
+        results = list(ddgs.text(f"hotels in {destination} site:booking.com", max_results=max_results))
+    return [r['href'] for r in results if 'booking.com' in r['href']]
+
 def search_hotel_links(destination, max_results=5):
+    key = make_key("search", destination.strip().casefold(), max_results)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached["links"]
+
+    # Concurrent identical searches wait on the first one instead of querying DDG again
+    return search_flights.do(key, lambda: _search_and_cache(key, destination, max_results))
+
+def _search_and_cache(key, destination, max_results):
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(f"hotels in {destination} site:booking.com", max_results=max_results))
-        return [r['href'] for r in results if 'booking.com' in r['href']]
+        links = _search_live(destination, max_results)
     except Exception as e:
+        logger.info("hotel search for %s failed: %s", destination, e)
+        search_cache.set(key, {"links": [], "error": str(e)}, ttl=SEARCH_NEGATIVE_TTL)
         return []
+    search_cache.set(key, {"links": links}, ttl=SEARCH_CACHE_TTL if links else SEARCH_NEGATIVE_TTL)
+    return links
+
+def _fetch_page(url, timeout, entry=None, foreground=True):
+    """Fetch and extract a hotel page, revalidating entry if one is given.
+
+    Only foreground fetches count as lookups in cache_stats().
+    """
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    started = time.monotonic()
+    res = get_session().get(url, timeout=timeout, stream=True, headers=headers)
 
-def scrape_hotel_details(url):
+    if entry and res.status_code == 304:
+        res.close()
+        # A stale hit already counted these bytes when it served the entry
+        if foreground:
+            _count("not_modified")
+            _count("bytes_saved", entry.get("size", 0))
+        # A 304 may omit validators; keep the ones we already have
+        merged = CaseInsensitiveDict({"ETag": entry.get("etag"), "Last-Modified": entry.get("last_modified")})
+        merged.update(res.headers)
+        _store(url, entry["record"], merged, entry.get("size", 0))
+        return entry["record"]
+
+    if foreground:
+        _count("misses")
+    total_bytes = int(res.headers.get("Content-Length") or 0)
+    # requests assumes ISO-8859-1 when no charset is given; pages here are UTF-8
+    encoding = res.encoding if "charset" in res.headers.get("Content-Type", "").lower() else "utf-8"
+    head, wire_bytes, stopped_early = read_head(res)
+    _record_fetch(url, wire_bytes, total_bytes, time.monotonic() - started, stopped_early)
+
+    soup = BeautifulSoup(head.decode(encoding, errors="replace"), 'html.parser', parse_only=_HEAD_TAGS)
+
+    title = soup.title.text.strip() if soup.title else "No title"
+    snippet = soup.find('meta', {'name': 'description'})
+    desc = snippet['content'].strip() if snippet else "No description available"
+
+    record = {
+        "name": title,
+        "description": desc,
+        "url": url
+    }
+    if res.status_code == 200:
+        _store(url, record, res.headers, total_bytes or wire_bytes)
+    return record
+
+def _revalidate_in_background(url, entry):
+    with _stats_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+
+    def run():
+        try:
+            _fetch_page(url, REQUEST_TIMEOUT, entry, foreground=False)
+        except Exception as e:
+            logger.info("background revalidation of %s failed: %s", url, e)
+        finally:
+            with _stats_lock:
+                _revalidating.discard(url)
+
+    _fetch_pool.submit(run)
+
+def scrape_hotel_details(url, timeout=REQUEST_TIMEOUT):
+    entry = page_cache.get(url)
+    now = time.time()
+    if entry and now < entry["fresh_until"]:
+        _count("fresh_hits")
+        _count("bytes_saved", entry.get("size", 0))
+        return entry["record"]
+    if entry and now < entry["stale_until"]:
+        _count("stale_hits")
+        _count("bytes_saved", entry.get("size", 0))
+        _revalidate_in_background(url, entry)
+        return entry["record"]
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        res = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(res.text, 'html.parser')
-
-        title = soup.title.text.strip() if soup.title else "No title"
-        snippet = soup.find('meta', {'name': 'description'})
-        desc = snippet['content'].strip() if snippet else "No description available"
-
-        return {
-            "name": title,
-            "description": desc,
-            "url": url
-        }
+        return _fetch_page(url, timeout, entry)
     except Exception as e:
+        if entry:
+            # Past the stale window but better than an error card
+            return entry["record"]
         return {"name": "Error", "description": str(e), "url": url}
 
-def scrape_hotels(destination, check_in, check_out):
+def scrape_hotels(destination, check_in, check_out, deadline=SCRAPE_DEADLINE):
+    """Hotels for a stay; identical concurrent requests share one scrape"""
+    key = (destination.strip().casefold(), str(check_in), str(check_out))
+    return hotel_flights.do(key, lambda: _scrape_hotels(destination, deadline), timeout=deadline)
+
+def _scrape_hotels(destination, deadline):
+    started = time.monotonic()
     links = search_hotel_links(destination)
-    hotels = [scrape_hotel_details(link) for link in links]
+    remaining = deadline - (time.monotonic() - started)
+    timeout = max(0.1, min(REQUEST_TIMEOUT, remaining))
+    hotels = fetch_all(lambda link: scrape_hotel_details(link, timeout=timeout), links, remaining)
     return hotels
@@ -1,356 +1,24 @@
 # main.py 
 import streamlit as st
 import datetime
-from ai_itinerary import generate_itinerary_prompt, generate_with_cohere
-from mock_data import generate_mock_flights, generate_mock_hotels, generate_mock_car_rentals
-import folium
-from streamlit_folium import folium_static
-import random  # Added for fallback when scraper fails
-
-# Fallback function when scraper fails
-def fallback_hotels(destination, check_in, check_out):
-    """Generate backup hotel data if the scraper fails"""
-    hotels = []
-    hotel_names = {
-        "Paris": ["Grand Hôtel de Paris", "Le Marais Suites", "Eiffel View Residence"],
-        "Tokyo": ["Shinjuku Plaza Hotel", "Tokyo Bay Resort", "Imperial Garden Inn"],
-        "New York": ["Manhattan Skyline Hotel", "Broadway Comfort Inn", "Central Park Lodge"],
-        "Dubai": ["Palm Luxury Resort", "Desert Oasis Hotel", "Marina View Suites"]
-    }
-    
-    descriptions = [
-        f"Experience the heart of {destination} at this centrally located hotel with modern amenities and exceptional service.",
-        f"Situated in the most vibrant district of {destination}, this hotel offers comfort and convenience for all travelers.",
-        f"Luxury accommodations with stunning views of {destination}'s most iconic landmarks."
-    ]
-    
-    names = hotel_names.get(destination, ["Luxury Hotel", "City Center Inn", "Plaza Resort"])
-    
-    for i in range(min(3, len(names))):
-        hotels.append({
-            "name": names[i],
-            "description": descriptions[i % len(descriptions)],
-            "url": f"https://example.com/hotels/{destination.lower().replace(' ', '-')}/{i+1}"
-        })
-    return hotels
-
-# Fallback function for flights
-def fallback_flights(origin, destination, departure_date, return_date):
-    """Generate backup flight data if the scraper fails"""
-    return generate_mock_flights(origin, destination, departure_date, return_date)
-
-# Fallback function for car rentals
-def fallback_car_rentals(location, start_date, end_date):
-    """Generate backup car rental data if the scraper fails"""
-    return generate_mock_car_rentals(location, start_date, end_date)
-
-# Safe scraper function that falls back to mock data
-def safe_scrape_hotels(destination, check_in, check_out):
-    """Attempt to scrape hotels, fallback to mock data if fails"""
-    try:
-        from scraper import scrape_hotels
-        results = scrape_hotels(destination, check_in, check_out)
-        if not results or len(results) == 0:
-            return fallback_hotels(destination, check_in, check_out)
-        return results
-    except Exception as e:
-        st.warning(f"Hotel data couldn't be scraped: {str(e)}. Using simulated data instead.")
-        return fallback_hotels(destination, check_in, check_out)
-    
-# New function for scraping flights
-def safe_scrape_flights(origin, destination, departure_date, return_date):
-    """Attempt to scrape flights, fallback to mock data if fails"""
-    try:
-        from scraper import scrape_flights
-        results = scrape_flights(origin, destination, departure_date, return_date)
-        if not results or len(results) == 0:
-            return fallback_flights(origin, destination, departure_date, return_date)
-        return results
-    except Exception as e:
-        st.warning(f"Flight data couldn't be scraped: {str(e)}. Using simulated data instead.")
-        return fallback_flights(origin, destination, departure_date, return_date)
-
-# New function for scraping car rentals
-def safe_scrape_car_rentals(location, start_date, end_date):
-    """Attempt to scrape car rentals, fallback to mock data if fails"""
-    try:
-        from scraper import scrape_car_rentals
-        results = scrape_car_rentals(location, start_date, end_date)
-        if not results or len(results) == 0:
-            return fallback_car_rentals(location, start_date, end_date)
-        return results
-    except Exception as e:
-        st.warning(f"Car rental data couldn't be scraped: {str(e)}. Using simulated data instead.")
-        return fallback_car_rentals(location, start_date, end_date)
+from cards import render_cards
+from itinerary import day_markdown, itinerary_markdown, parse_itinerary
+from mock_data import generate_mock_car_rentals
+from offers import OFFERS_PAGE_SIZE, OfferIndex
+from startup import lazy_import
+from theme import inject_theme
+import warmup
 
 st.set_page_config(page_title="TravelBuddy - AI Tour Planner", page_icon="✈️", layout="wide")
 
-# Enhanced CSS with modern UI elements
-st.markdown("""
-    <style>
-        /* Main container styling */
-        .main {
-            padding: 2rem;
-            background-color: #1e1e1e;
-            color: #f5f5f5;
-            transition: all 0.3s ease;
-        }
-        
-        /* Typography */
-        h1 {
-            font-weight: 900;
-            margin-bottom: 2rem;
-            color: #FF4081;  /* Savage pink */
-            font-size: 3rem;
-            letter-spacing: -1px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-        }
-        
-        h2 {
-            font-weight: 700;
-            margin-bottom: 1rem;
-            color: #FF4081;
-        }
-        
-        h3 {
-            font-weight: 600;
-            margin-bottom: 0.8rem;
-            color: #FF4081;
-        }
-        
-        /* Card design with glassmorphism */
-        .card {
-            background-color: rgba(44, 47, 56, 0.8);
-            border-radius: 16px;
-            padding: 1.5rem;
-            margin-bottom: 1.5rem;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-            backdrop-filter: blur(12px);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            transition: transform 0.3s, box-shadow 0.3s;
-        }
-        
-        .card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 12px 32px rgba(255, 64, 129, 0.2);
-        }
-        
-        /* Travel item cards */
-        .travel-item {
-            background-color: rgba(44, 47, 56, 0.5);
-            border-radius: 12px;
-            padding: 16px;
-            margin-bottom: 16px;
-            border-left: 4px solid #FF4081;
-            transition: all 0.2s ease;
-        }
-        
-        .travel-item:hover {
-            background-color: rgba(44, 47, 56, 0.7);
-            transform: translateX(5px);
-        }
-        
-        /* Progress indicators */
-        .step-progress {
-            display: flex;
-            justify-content: space-between;
-            margin: 2rem 0;
-            position: relative;
-        }
-        
-        .step-progress:before {
-            content: '';
-            position: absolute;
-            background: #444;
-            height: 4px;
-            width: 100%;
-            top: 50%;
-            transform: translateY(-50%);
-            z-index: 0;
-        }
-        
-        .step {
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            background: #333;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-weight: bold;
-            position: relative;
-            z-index: 1;
-            border: 2px solid #444;
-        }
-        
-        .step.active {
-            background: #FF4081;
-            border-color: #FF4081;
-        }
-        
-        .step.completed {
-            background: #4CAF50;
-            border-color: #4CAF50;
-        }
-        
-        /* Enhanced button styles */
-        .primary-btn {
-            background: linear-gradient(135deg, #FF4081 0%, #C2185B 100%);
-            color: white;
-            padding: 10px 20px;
-            border-radius: 30px;
-            font-weight: bold;
-            border: none;
-            cursor: pointer;
-            box-shadow: 0 4px 10px rgba(255, 64, 129, 0.3);
-            transition: all 0.3s ease;
-        }
-        
-        .primary-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 6px 15px rgba(255, 64, 129, 0.4);
-        }
-        
-        .secondary-btn {
-            background: rgba(255, 255, 255, 0.1);
-            color: white;
-            padding: 10px 20px;
-            border-radius: 30px;
-            font-weight: bold;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        
-        .secondary-btn:hover {
-            background: rgba(255, 255, 255, 0.2);
-        }
-        
-        /* Destination selection styles */
-        .destination-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
-            gap: 1rem;
-            margin-top: 1.5rem;
-        }
-        
-        .destination-card {
-            background-size: cover;
-            background-position: center;
-            height: 150px;
-            border-radius: 12px;
-            display: flex;
-            align-items: flex-end;
-            padding: 1rem;
-            position: relative;
-            overflow: hidden;
-            cursor: pointer;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-            transition: all 0.3s ease;
-        }
-        
-        .destination-card:before {
-            content: '';
-            position: absolute;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            height: 60%;
-            background: linear-gradient(to top, rgba(0,0,0,0.7), transparent);
-            z-index: 1;
-        }
-        
-        .destination-card:hover {
-            transform: scale(1.05);
-        }
-        
-        .destination-name {
-            color: white;
-            font-weight: bold;
-            position: relative;
-            z-index: 2;
-        }
-        
-        /* Animation keyframes */
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-        
-        .animate-fade {
-            animation: fadeIn 0.5s ease-in-out;
-        }
-        
-        /* Loading spinner */
-        .loader {
-            border: 5px solid #f3f3f3;
-            border-top: 5px solid #FF4081;
-            border-radius: 50%;
-            width: 50px;
-            height: 50px;
-            animation: spin 1s linear infinite;
-            margin: 20px auto;
-        }
-        
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-        
-        /* Custom selectbox styling */
-        div[data-baseweb="select"] {
-            background-color: rgba(44, 47, 56, 0.8) !important;
-            border-radius: 10px !important;
-            border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        }
-        
-        /* Tab styling */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 10px;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            background-color: rgba(44, 47, 56, 0.7);
-            border-radius: 10px 10px 0 0;
-            border: none !important;
-            padding: 10px 20px;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background-color: rgba(255, 64, 129, 0.2) !important;
-            border-bottom: 3px solid #FF4081 !important;
-        }
-        
-        /* Map container */
-        .map-container {
-            border-radius: 12px;
-            overflow: hidden;
-            box-shadow: 0 8px 16px rgba(0,0,0,0.2);
-        }
-        
-        /* Dark scrollbar */
-        ::-webkit-scrollbar {
-            width: 8px;
-            height: 8px;
-        }
-        
-        ::-webkit-scrollbar-track {
-            background: #1e1e1e;
-        }
-        
-        ::-webkit-scrollbar-thumb {
-            background: #444;
-            border-radius: 4px;
-        }
-        
-        ::-webkit-scrollbar-thumb:hover {
-            background: #FF4081;
-        }
-    </style>
-""", unsafe_allow_html=True)
+# Global CSS, sent once per session
+inject_theme()
 
 # -------------------- INIT --------------------
+# Pre-fill the shared caches for the curated destinations (runs once per process)
+if warmup.WARMUP_ON_START:
+    warmup.start_background()
+
 if "step" not in st.session_state:
     st.session_state.step = 1
 if "form_data" not in st.session_state:
@@ -366,10 +34,18 @@ if "form_data" not in st.session_state:
     }
 if "ai_itinerary" not in st.session_state:
     st.session_state.ai_itinerary = ""
+if "itinerary_pending" not in st.session_state:
+    st.session_state.itinerary_pending = False
+if "pending_travel" not in st.session_state:
+    st.session_state.pending_travel = None
 if "travel_data" not in st.session_state:
     st.session_state.travel_data = {"flights": [], "hotels": [], "car_rentals": []}
 if "selected_destination" not in st.session_state:
     st.session_state.selected_destination = ""
+if "offer_indexes" not in st.session_state:
+    st.session_state.offer_indexes = {}
+if "export_files" not in st.session_state:
+    st.session_state.export_files = {}  # export key -> bytes, loaded once per finished file
 
 # -------------------- HEADER --------------------
 st.title("✈️ TravelBuddy - Your AI Travel Companion")
@@ -399,6 +75,8 @@ def show_progress():
     st.write("")  # Add some space after the progress bar
 
 # -------------------- STEP 1: Destination Selection --------------------
+# Fragments rerun on their own when their widgets change; only navigation reruns the whole page
+@st.fragment
 def step_destination_selection():
     st.markdown("### Where are you departing from?")
     origin = st.text_input("Enter your current country/city of departure", value=st.session_state.form_data.get("origin", ""))
@@ -432,6 +110,17 @@ def step_destination_selection():
     # Hidden select to capture the click
     dest = st.selectbox("Select destination", list(destinations.keys()), 
                       key="destination-select", label_visibility="collapsed")
+
+    # Any other city, suggested from the offline gazetteer as the user types
+    query = st.text_input("Or search any city", key="destination-search", placeholder="Start typing a city name")
+    if query:
+        matches = lazy_import("gazetteer").search(query, limit=8)
+        if matches:
+            city = st.selectbox("Matching cities", matches, key="destination-match",
+                                format_func=lambda c: f"{c.name}, {c.country}")
+            dest = city.name
+        else:
+            st.caption("No matching city found")
     st.session_state.form_data["destination"] = dest
     
     col1, col2 = st.columns(2)
@@ -499,6 +188,7 @@ def step_destination_selection():
     # Hidden button to capture the click
     if st.button("Next", key="next_step_1", help="Proceed to preferences", type="primary", use_container_width=False):
         st.session_state.step = 2
+        st.rerun()
     
     st.markdown("</div>", unsafe_allow_html=True)  # Close animation div
 
@@ -538,6 +228,26 @@ def step_preferences():
             </div>
         """, unsafe_allow_html=True)
     
+    preference_picker()
+
+    # Navigation buttons
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("⬅️ Back", help="Go back to Step 1", type="secondary"):
+            st.session_state.step = 1
+            st.rerun()
+    with col2:
+        if st.button("Generate Itinerary ✨", key="generate_itinerary_btn", 
+                   help="Generate your AI-powered itinerary", type="primary"):
+            with st.spinner("Creating your personalized travel itinerary..."):
+                generate_itinerary()
+            st.session_state.step = 3
+            st.rerun()
+    
+    st.markdown("</div>", unsafe_allow_html=True)  # Close animation div
+
+@st.fragment
+def preference_picker():
     st.markdown("### What are you interested in?")
     
     # Interest selection with icons
@@ -570,7 +280,7 @@ def step_preferences():
                             st.session_state.form_data["activities"].remove(key)
                         else:
                             st.session_state.form_data["activities"].append(key)
-                        st.rerun()
+                        st.rerun(scope="fragment")
     
     # Transportation options
     st.markdown("### How do you prefer to get around?")
@@ -591,40 +301,221 @@ def step_preferences():
                 use_container_width=True
             ):
                 st.session_state.form_data["transportation"] = key
-                st.rerun()
-    
-    # Navigation buttons
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("⬅️ Back", help="Go back to Step 1", type="secondary"):
-            st.session_state.step = 1
-    with col2:
-        if st.button("Generate Itinerary ✨", key="generate_itinerary_btn", 
-                   help="Generate your AI-powered itinerary", type="primary"):
-            with st.spinner("Creating your personalized travel itinerary..."):
-                generate_itinerary()
-            st.session_state.step = 3
-    
-    st.markdown("</div>", unsafe_allow_html=True)  # Close animation div
+                st.rerun(scope="fragment")
 
 # -------------------- ITINERARY ENGINE --------------------
 def generate_itinerary():
-    data = st.session_state.form_data
-    
-    # AI itinerary
-    prompt = generate_itinerary_prompt(data)
-    st.session_state.ai_itinerary = generate_with_cohere(prompt)
+    # The engine and its Cohere client are only loaded once the user asks for a plan
+    engine = lazy_import("ai_itinerary")
+    # Structured itineraries are only usable once complete, so they are never streamed
+    streaming = engine.ITINERARY_STREAMING and not engine.STRUCTURED
+    get_planner = lazy_import("planner_client").get_planner
+    # Snapshot the form so worker threads never see later edits
+    data = dict(st.session_state.form_data, activities=list(st.session_state.form_data["activities"]))
 
-    # Travel data
-    st.session_state.travel_data["flights"] = generate_mock_flights(
-        data["origin"], data["destination"], data["start_date"], data["end_date"])
-    
-    st.session_state.travel_data["car_rentals"] = generate_mock_car_rentals(
-        data["destination"], data["start_date"], data["end_date"])
+    # Flights, hotels and cars are fetched concurrently by the planning engine (in-process or
+    # the planner service), each falling back to simulated data on its own deadline.
+    # In streaming mode the itinerary text is produced progressively by show_results instead.
+    st.session_state.ai_itinerary = ""
+    st.session_state.itinerary_pending = streaming
+    st.session_state.pending_travel = get_planner().start_plan(data, include_itinerary=not streaming)
+    if not streaming:
+        st.session_state.pending_travel.result()
+
+def resolve_travel_data():
+    """Collect the plan started by generate_itinerary into session_state"""
+    pending = st.session_state.pending_travel
+    if pending is None:
+        return
+    try:
+        plan = pending.result()
+    except Exception as e:
+        st.error(f"Couldn't load your trip details: {e}")
+        st.session_state.pending_travel = None
+        return
+    st.session_state.pending_travel = None
+    if "itinerary" in plan:
+        st.session_state.ai_itinerary = plan["itinerary"]
+    for name in ("flights", "hotels", "car_rentals"):
+        st.session_state.travel_data[name] = plan[name]
+    for warning in plan["warnings"]:
+        st.warning(warning)
+
+# -------------------- MAP --------------------
+def show_map(dest):
+    """Render the destination map with hotel and attraction markers"""
+    try:
+        # Built once per (destination, hotels) and reused across reruns
+        hotel_names = tuple(hotel["name"] for hotel in st.session_state.travel_data["hotels"][:3])
+        html = lazy_import("maps").map_html(dest, hotel_names)
+
+        # Display map in a custom container
+        st.markdown('<div class="map-container">', unsafe_allow_html=True)
+        lazy_import("streamlit.components.v1").html(html, width=1500, height=310)
+        st.markdown('</div>', unsafe_allow_html=True)
+    except Exception as e:
+        st.warning(f"Could not load map: {e}")
+
+# -------------------- RESULT TABS --------------------
+def offer_index(kind):
+    """Sort/filter index for the current offers of kind, rebuilt only when the offers change"""
+    items = st.session_state.travel_data[kind]
+    index = st.session_state.offer_indexes.get(kind)
+    if index is None or index.items is not items:
+        index = st.session_state.offer_indexes[kind] = OfferIndex(kind, items)
+    return index
+
+def _first_page(kind):
+    st.session_state[f"{kind}_page"] = 0
+
+def render_offer_list(kind):
+    """Sorted, filtered offers one page at a time; only the visible page is rendered"""
+    index = offer_index(kind)
+    if not index.items:
+        return
+    reset = {"on_change": _first_page, "args": (kind,)}
+    col1, col2, col3 = st.columns([2, 3, 1])
+    with col1:
+        sort = st.selectbox("Sort by", index.sort_options(), key=f"{kind}_sort", **reset)
+    max_price = None
+    price_range = index.price_range()
+    with col2:
+        if price_range and price_range[1] - price_range[0] > 1:
+            max_price = st.slider("Max price ($)", *price_range, value=price_range[1], key=f"{kind}_max_price", **reset)
+    direct_only = False
+    with col3:
+        if kind == "flights":
+            direct_only = st.checkbox("Direct only", key=f"{kind}_direct", **reset)
+
+    view = index.view(sort, max_price, direct_only)
+    pages = max(1, -(-len(view) // OFFERS_PAGE_SIZE))
+    page = min(st.session_state.get(f"{kind}_page", 0), pages - 1)
+
+    # One batched markdown call for the page, cached per result set
+    st.markdown(render_cards(kind, index.page(view, page)), unsafe_allow_html=True)
+    if not view:
+        st.caption("No offers match these filters.")
+    elif pages > 1:
+        col1, col2, col3 = st.columns([1, 3, 1])
+        with col1:
+            if st.button("⬅️ Previous", key=f"{kind}_prev", disabled=page == 0):
+                st.session_state[f"{kind}_page"] = page - 1
+                st.rerun(scope="fragment")
+        with col2:
+            first = page * OFFERS_PAGE_SIZE + 1
+            st.caption(f"Showing {first}–{min(first + OFFERS_PAGE_SIZE - 1, len(view))} of {len(view)} offers")
+        with col3:
+            if st.button("Next ➡️", key=f"{kind}_next", disabled=page >= pages - 1):
+                st.session_state[f"{kind}_page"] = page + 1
+                st.rerun(scope="fragment")
+
+@st.fragment
+def offer_list(kind):
+    render_offer_list(kind)
+
+def show_itinerary(text):
+    """Structured itineraries get day navigation and only the selected day is rendered"""
+    itinerary = parse_itinerary(text)
+    if not itinerary.structured:
+        st.markdown(text)
+        return
+    if itinerary.intro:
+        st.markdown(itinerary.intro)
+    days = {day.number: day for day in itinerary.days}
+    number = st.radio("Day", list(days), horizontal=True, key="itinerary_day", label_visibility="collapsed",
+                      format_func=lambda n: f"Day {n}")
+    st.markdown(day_markdown(days[number]))
+
+@st.fragment
+def itinerary_tab(dest):
+    if st.session_state.itinerary_pending:
+        ItineraryError = lazy_import("ai_itinerary").ItineraryError
+        get_planner = lazy_import("planner_client").get_planner
+        # Render tokens as they arrive; write_stream returns the full text once done
+        try:
+            st.session_state.ai_itinerary = st.write_stream(
+                get_planner().stream_itinerary(st.session_state.form_data))
+        except ItineraryError as e:
+            st.session_state.ai_itinerary = ""
+            st.error(f"We couldn't generate your itinerary right now ({e}). Please try again in a moment.")
+        st.session_state.itinerary_pending = False
+    else:
+        resolve_travel_data()
+        show_itinerary(st.session_state.ai_itinerary)
+
+    if not st.session_state.ai_itinerary and st.button("🔄 Retry itinerary"):
+        # Same path as the first attempt, so JSON and non-streaming itineraries are never streamed
+        with st.spinner("Creating your personalized travel itinerary..."):
+            generate_itinerary()
+        st.rerun()
+    
+    # Add download button for itinerary
+    if st.session_state.ai_itinerary:
+        st.download_button(
+            label="📥 Download Itinerary",
+            data=itinerary_markdown(st.session_state.ai_itinerary),
+            file_name=f"{dest}_itinerary.md",
+            mime="text/markdown",
+        )
+
+@st.fragment
+def car_rentals_tab():
+    # Car rental display
+    if st.session_state.form_data["transportation"] == "rental car":
+        render_offer_list("car_rentals")
+    else:
+        st.info(f"You have selected {st.session_state.form_data['transportation']} as your primary transportation mode. Car rentals are optional.")
+        
+        if st.button("Browse Available Cars", type="secondary"):
+            st.session_state.travel_data["car_rentals"] = generate_mock_car_rentals(
+                st.session_state.form_data["destination"], 
+                st.session_state.form_data["start_date"], 
+                st.session_state.form_data["end_date"])
+            st.rerun(scope="fragment")
     
-    # Use safe scraper with fallback
-    st.session_state.travel_data["hotels"] = safe_scrape_hotels(
-        data["destination"], data["start_date"], data["end_date"])
+
+EXPORT_LABELS = {"pdf": "📄 PDF", "ics": "📅 Add to calendar"}
+
+def export_panel(dest):
+    """PDF and calendar files are built by the export workers; the panel only polls while one is in progress"""
+    if not st.session_state.ai_itinerary:
+        return
+    exports = lazy_import("exports")
+    payload = exports.export_payload(st.session_state.form_data, st.session_state.ai_itinerary,
+                                     st.session_state.travel_data)
+    keys = {fmt: exports.export_key(fmt, payload) for fmt in exports.FORMATS}
+    polling = any(exports.is_pending(key) for key in keys.values())
+    st.fragment(export_buttons, run_every=1 if polling else None)(dest, payload, keys, polling)
+
+def export_buttons(dest, payload, keys, polling):
+    exports = lazy_import("exports")
+    # Keep only this trip's files; polling must not re-read a finished one every second
+    files = {key: data for key, data in st.session_state.export_files.items() if key in keys.values()}
+    st.session_state.export_files = files
+    for column, (fmt, key) in zip(st.columns(len(keys)), keys.items()):
+        mime, extension = exports.FORMATS[fmt]
+        with column:
+            status, result = exports.export_status(key)
+            if status == "ready" and key not in files:
+                files[key] = exports.export_file(key)
+                if files[key] is None:
+                    del files[key]
+                    status = "missing"
+            if status == "ready":
+                st.download_button(f"{EXPORT_LABELS[fmt]} ⬇️", data=files[key], file_name=f"{dest}_itinerary.{extension}",
+                                   mime=mime, key=f"export_{fmt}_download")
+            elif status == "pending":
+                st.button(f"{EXPORT_LABELS[fmt]} (preparing…)", disabled=True, key=f"export_{fmt}_pending")
+            else:
+                if status == "failed":
+                    st.caption(f"Export failed ({result}).")
+                if st.button(EXPORT_LABELS[fmt], key=f"export_{fmt}"):
+                    exports.request_export(fmt, payload)
+                    st.rerun()  # re-enter the panel with polling on
+    # Full rerun once the last job is done, so the panel stops polling
+    if polling and not any(exports.is_pending(key) for key in keys.values()):
+        st.rerun()
+
 
 # -------------------- FINAL DISPLAY --------------------
 def show_results():
@@ -674,207 +565,35 @@ def show_results():
         </div>
     """, unsafe_allow_html=True)
     
-    # Create a map for the destination
-    try:
-        # Get approximate coordinates for each destination
-        coordinates = {
-            "Paris": [48.8566, 2.3522],
-            "Tokyo": [35.6762, 139.6503],
-            "New York": [40.7128, -74.0060],
-            "Dubai": [25.2048, 55.2708]
-        }
-        
-        lat, lon = coordinates.get(dest, [0, 0])
-        
-        # Create map
-        m = folium.Map(location=[lat, lon], zoom_start=12)
-        folium.Marker(
-            [lat, lon], 
-            popup=dest,
-            icon=folium.Icon(color="pink", icon="star")
-        ).add_to(m)
-        
-        # Add some hotel markers
-        for i, hotel in enumerate(st.session_state.travel_data["hotels"][:3]):
-            # Simulate locations around the center
-            hlat = lat + (random.random() - 0.5) * 0.02
-            hlon = lon + (random.random() - 0.5) * 0.02
-            folium.Marker(
-                [hlat, hlon],
-                popup=hotel["name"],
-                icon=folium.Icon(color="blue", icon="home")
-            ).add_to(m)
-        
-        # Add some attraction locations
-        attractions = ["Museum", "Restaurant", "Park", "Shopping"]
-        for attr in attractions[:5]:
-            alat = lat + (random.random() - 0.5) * 0.03
-            alon = lon + (random.random() - 0.5) * 0.03
-            folium.Marker(
-                [alat, alon],
-                popup=f"{attr}",
-                icon=folium.Icon(color="green", icon="info-sign")
-            ).add_to(m)
-            
-        # Display map in a custom container
-        st.markdown('<div class="map-container">', unsafe_allow_html=True)
-        folium_static(m, width=1500, height=300)
-        st.markdown('</div>', unsafe_allow_html=True)
-    except Exception as e:
-        st.warning(f"Could not load map: {e}")
+    # The map needs the hotel list, so it is filled in once travel data is resolved
+    map_slot = st.container()
     
     # Display tabs
     tab1, tab2, tab3, tab4 = st.tabs(["🗓️ Itinerary", "✈️ Flights", "🏨 Hotels", "🚗 Cars"])
 
     with tab1:
-        st.markdown(st.session_state.ai_itinerary)
-        
-        # Add download button for itinerary
-        st.download_button(
-            label="📥 Download Itinerary",
-            data=st.session_state.ai_itinerary,
-            file_name=f"{dest}_itinerary.md",
-            mime="text/markdown",
-        )
+        itinerary_tab(dest)
+
+    # Flights, hotels and cars were fetched while the itinerary streamed
+    resolve_travel_data()
+    with map_slot:
+        show_map(dest)
 
     with tab2:
-    # Enhanced flight display
-        for i, f in enumerate(st.session_state.travel_data["flights"]):
-            with st.container():
-                st.markdown(f"""
-                    <div class="travel-item">
-                        <div style="display: flex; justify-content: space-between; align-items: center;">
-                            <div>
-                                <span style="font-size: 18px; font-weight: bold; color: #FF4081;">{f['airline']}</span>
-                                <span style="font-size: 14px; opacity: 0.8;"> • Flight {f['flight_number']}</span>
-                            </div>
-                            <div style="font-size: 18px; font-weight: bold;">
-                                ${f['price']}
-                            </div>
-                        </div>
-                        <div style="display: flex; justify-content: space-between; margin-top: 12px;">
-                            <div>
-                                <div style="font-size: 16px; font-weight: bold;">{f['departure_time']}</div>
-                                <div style="font-size: 14px; opacity: 0.8;">{f['origin']}</div>
-                            </div>
-                            <div style="display: flex; flex-direction: column; align-items: center;">
-                                <div style="font-size: 12px; opacity: 0.8;">{f['duration']}</div>
-                                <div style="width: 100px; height: 2px; background: rgba(255,255,255,0.2); 
-                                    position: relative; margin: 8px 0;">
-                                    <div style="position: absolute; width: 8px; height: 8px; 
-                                        background: #FF4081; border-radius: 50%; 
-                                        left: 0; top: -3px;"></div>
-                                    <div style="position: absolute; width: 8px; height: 8px; 
-                                        background: #FF4081; border-radius: 50%; 
-                                        right: 0; top: -3px;"></div>
-                                </div>
-                                <div style="font-size: 12px; opacity: 0.8;">{f.get('stops', 'Direct')}</div>
-                            </div>
-                            <div style="text-align: right;">
-                                <div style="font-size: 16px; font-weight: bold;">{f['arrival_time']}</div>
-                                <div style="font-size: 14px; opacity: 0.8;">{f['destination']}</div>
-                            </div>
-                        </div>
-                        <div style="margin-top: 12px; text-align: right;">
-                            <button class="secondary-btn" style="font-size: 14px; padding: 6px 12px;">
-                                View Details
-                            </button>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
+        offer_list("flights")
 
         # Add a note about simulated data
         st.info("Note: Flight information is simulated for demonstration purposes.")
 
     with tab3:
-        # Hotels display
-        for hotel in st.session_state.travel_data["hotels"]:
-            st.markdown(f"""
-                <div class="travel-item">
-                    <div style="display: flex; justify-content: space-between; align-items: center;">
-                        <div style="font-size: 18px; font-weight: bold; color: #FF4081;">
-                            {hotel['name']}
-                        </div>
-                        <div style="font-size: 16px; font-weight: bold;">
-                            ${random.randint(80, 300)}/night
-                        </div>
-                    </div>
-                    <div style="margin-top: 10px; font-size: 14px;">
-                        {hotel.get('description', 'No description available')}
-                    </div>
-                    <div style="margin-top: 12px; display: flex; justify-content: space-between; align-items: center;">
-                        <div>
-                            <span style="background: rgba(255,255,255,0.1); padding: 4px 8px; 
-                                border-radius: 4px; font-size: 12px; margin-right: 6px;">
-                                Wi-Fi
-                            </span>
-                            <span style="background: rgba(255,255,255,0.1); padding: 4px 8px; 
-                                border-radius: 4px; font-size: 12px; margin-right: 6px;">
-                                Breakfast
-                            </span>
-                            <span style="background: rgba(255,255,255,0.1); padding: 4px 8px; 
-                                border-radius: 4px; font-size: 12px;">
-                                Pool
-                            </span>
-                        </div>
-                        <button class="secondary-btn" style="font-size: 14px; padding: 6px 12px;">
-                            Book Now
-                        </button>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+        offer_list("hotels")
         
         # Add a note about simulated data
         st.info("Note: Hotel information is simulated for demonstration purposes.")
 
     with tab4:
-        # Car rental display
-        if st.session_state.form_data["transportation"] == "rental car":
-            for car in st.session_state.travel_data["car_rentals"]:
-                st.markdown(f"""
-                    <div class="travel-item">
-                        <div style="display: flex; justify-content: space-between; align-items: center;">
-                            <div style="font-size: 18px; font-weight: bold; color: #FF4081;">
-                                {car['car_type']}
-                            </div>
-                            <div style="font-size: 16px; font-weight: bold;">
-                                ${car['price_per_day']}/day
-                            </div>
-                        </div>
-                        <div style="margin-top: 10px; font-size: 14px;">
-                            {car.get('description', 'Comfortable ride for your trip.')}
-                        </div>
-                        <div style="margin-top: 12px; display: flex; justify-content: space-between; align-items: center;">
-                            <div>
-                                <span style="background: rgba(255,255,255,0.1); padding: 4px 8px; 
-                                    border-radius: 4px; font-size: 12px; margin-right: 6px;">
-                                    {car.get('seats', 5)} seats
-                                </span>
-                                <span style="background: rgba(255,255,255,0.1); padding: 4px 8px; 
-                                    border-radius: 4px; font-size: 12px; margin-right: 6px;">
-                                    {car.get('transmission', 'Automatic')}
-                                </span>
-                                <span style="background: rgba(255,255,255,0.1); padding: 4px 8px; 
-                                    border-radius: 4px; font-size: 12px;">
-                                    {car.get('category', 'Compact')}
-                                </span>
-                            </div>
-                            <button class="secondary-btn" style="font-size: 14px; padding: 6px 12px;">
-                                Reserve
-                            </button>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
-        else:
-            st.info(f"You have selected {st.session_state.form_data['transportation']} as your primary transportation mode. Car rentals are optional.")
-            
-            if st.button("Browse Available Cars", type="secondary"):
-                st.session_state.travel_data["car_rentals"] = generate_mock_car_rentals(
-                    st.session_state.form_data["destination"], 
-                    st.session_state.form_data["start_date"], 
-                    st.session_state.form_data["end_date"])
-                st.rerun()
-        
+        car_rentals_tab()
+
         # Add a note about simulated data
         st.info("Note: Car rental information is simulated for demonstration purposes.")
 
@@ -890,12 +609,10 @@ def show_results():
                 <button class="secondary-btn" style="display: flex; align-items: center;">
                     <span style="margin-right: 8px;">📱</span> Text
                 </button>
-                <button class="secondary-btn" style="display: flex; align-items: center;">
-                    <span style="margin-right: 8px;">📄</span> PDF
-                </button>
             </div>
         </div>
         """, unsafe_allow_html=True)
+        export_panel(dest)
 
         # Start over button
         if st.button("Create New Trip", type="primary"):
@@ -910,6 +627,8 @@ def show_results():
                 "transportation": "public"
             }
             st.session_state.ai_itinerary = ""
+            st.session_state.itinerary_pending = False
+            st.session_state.pending_travel = None
             st.session_state.travel_data = {"flights": [], "hotels": [], "car_rentals": []}
             st.rerun()
         
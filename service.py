@@ -0,0 +1,140 @@
+# service.py
+import argparse
+import itertools
+import json
+import logging
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import planner
+from ai_itinerary import ItineraryError, ItineraryRateLimited
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class PlannerHandler(BaseHTTPRequestHandler):
+    """JSON API over the planning engine.
+
+    GET  /health               breaker states and recent latency per source
+    POST /v1/plan              {"form_data": {...}, "include_itinerary": true} -> plan JSON
+                               (429/503 when the itinerary failed; the body is still the plan)
+    POST /v1/itinerary/stream  {"form_data": {...}} -> chunked text/plain itinerary
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(payload.get("form_data"), dict):
+            raise ValueError("form_data must be an object")
+        return payload
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, planner.health())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+            form_data = planner.parse_form_data(payload["form_data"])
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if self.path == "/v1/plan":
+            try:
+                plan = planner.plan_trip(form_data, include_itinerary=payload.get("include_itinerary", True))
+            except Exception as e:
+                logger.exception("planning failed")
+                self._send_json(500, {"error": str(e)})
+                return
+            info = plan["report"].get("itinerary", {"status": "ok"})
+            if info["status"] == "ok":
+                self._send_json(200, plan)
+                return
+            # Same statuses as the stream endpoint, so clients can tell a failure from an itinerary
+            status = 429 if info.get("error_type") == ItineraryRateLimited.__name__ else 503
+            self._send_json(status, dict(plan, error=info.get("error") or "itinerary generation timed out"))
+        elif self.path == "/v1/itinerary/stream":
+            chunks = planner.stream_itinerary(form_data)
+            # Pull the first chunk before committing to a 200 so failures get a real status
+            try:
+                first = next(chunks, "")
+            except ItineraryRateLimited as e:
+                self._send_json(429, {"error": str(e)})
+                return
+            except ItineraryError as e:
+                self._send_json(503, {"error": str(e)})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in itertools.chain([first], chunks):
+                data = chunk.encode("utf-8")
+                if data:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+def serve(host, port, workers):
+    """Bind once, then pre-fork workers that all accept on the shared socket"""
+    server = ThreadingHTTPServer((host, port), PlannerHandler)
+    server.daemon_threads = True
+    children = []
+    for _ in range(max(1, workers) - 1):
+        pid = os.fork()
+        if pid == 0:
+            children = []
+            break
+        children.append(pid)
+
+    def shutdown(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    logger.info("planner worker %d listening on %s:%d", os.getpid(), host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        shutdown(signal.SIGINT, None)
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless TravelBuddy planning service")
+    parser.add_argument("--host", default=os.getenv("PLANNER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PLANNER_PORT", 8600)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PLANNER_WORKERS", os.cpu_count() or 1)))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    serve(args.host, args.port, args.workers)
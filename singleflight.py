@@ -0,0 +1,120 @@
+# singleflight.py
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class SingleFlight:
+    """Process-wide request coalescing.
+
+    The first caller for a key runs the work; concurrent callers with the same
+    key wait for that call and get the same result or exception. Nothing is
+    remembered once the call finishes -- caching is the caller's job.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key, factory):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.followers += 1
+                return call, False
+            call = self._calls[key] = factory()
+            self.leaders += 1
+            return call, True
+
+    def _leave(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once for all concurrent callers of key.
+
+        Followers raise TimeoutError if the leader has not finished within timeout.
+        """
+        future, leader = self._join(key, Future)
+        if not leader:
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeout:
+                raise TimeoutError(f"{self.name}: timed out waiting for in-flight call")
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(key)
+
+    def stream(self, key, gen_fn, timeout=None):
+        """Generator counterpart of do(): followers receive the leader's chunks as they arrive.
+
+        timeout bounds the wait for each next chunk.
+        """
+        broadcast, leader = self._join(key, _Broadcast)
+        if not leader:
+            yield from broadcast.subscribe(timeout, self.name)
+            return
+        try:
+            for chunk in gen_fn():
+                broadcast.publish(chunk)
+                yield chunk
+        except GeneratorExit:
+            broadcast.finish(RuntimeError(f"{self.name}: in-flight stream was abandoned"))
+            raise
+        except BaseException as e:
+            broadcast.finish(e)
+            raise
+        else:
+            broadcast.finish()
+        finally:
+            self._leave(key)
+
+    def stats(self):
+        with self._lock:
+            return {"name": self.name, "in_flight": len(self._calls),
+                    "leaders": self.leaders, "followers": self.followers}
+
+
+class _Broadcast:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def subscribe(self, timeout, name):
+        index = 0
+        while True:
+            with self.cond:
+                ready = self.cond.wait_for(lambda: len(self.chunks) > index or self.done, timeout)
+                if not ready:
+                    raise TimeoutError(f"{name}: timed out waiting for in-flight stream")
+                pending = self.chunks[index:]
+                finished = self.done
+                error = self.error
+            index += len(pending)
+            yield from pending
+            if finished and index >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
@@ -0,0 +1,68 @@
+# startup.py
+import importlib
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# What a fresh server process can end up importing; step 1 only needs streamlit
+HEAVY_MODULES = ["streamlit", "cohere", "folium", "requests", "bs4",
+                 "duckduckgo_search", "ai_itinerary", "planner", "planner_client", "scraper"]
+
+_lock = threading.Lock()
+_imports = {}  # module -> seconds spent importing it in this process
+
+
+def lazy_import(name):
+    """Import a module on first use, recording how long the import took.
+
+    Always goes through importlib, so a caller racing another thread's import
+    waits for the module to finish executing instead of getting it half-built
+    from sys.modules. Once the module is loaded this is cheap.
+    """
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if loaded:
+        return module
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _imports.setdefault(name, elapsed)
+    logger.info("lazy import of %s took %.0f ms", name, elapsed * 1000)
+    return module
+
+
+def import_report():
+    """Deferred imports this process has paid for so far, slowest first"""
+    with _lock:
+        costs = sorted(_imports.items(), key=lambda item: item[1], reverse=True)
+    return [{"module": name, "ms": round(seconds * 1000, 1)} for name, seconds in costs]
+
+
+def cold_import_cost(name):
+    """(self, cumulative) milliseconds to import name in a fresh interpreter, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {name}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ImportError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else name)
+    for line in reversed(result.stderr.splitlines()):
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$", line)
+        if match and match.group(3) == name:
+            return int(match.group(1)) / 1000, int(match.group(2)) / 1000
+    return 0.0, 0.0
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or HEAVY_MODULES
+    print(f"{'module':<20} {'cumulative ms':>14}")
+    for name in modules:
+        try:
+            _, cumulative = cold_import_cost(name)
+        except ImportError as e:
+            print(f"{name:<20} {'failed':>14}  ({e})")
+            continue
+        print(f"{name:<20} {cumulative:>14.1f}")
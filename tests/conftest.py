@@ -0,0 +1,9 @@
+# conftest.py
+import os
+import sys
+import tempfile
+
+# Modules live at the repo root; caches go to a throwaway database, not the working tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TRAVEL_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="travelbuddy-tests-"),
+                                                        "cache.sqlite3"))
@@ -0,0 +1,70 @@
+# test_batch.py
+import json
+import re
+from types import SimpleNamespace
+
+import ai_itinerary
+import batch
+
+
+def test_torn_last_record_is_truncated(tmp_path):
+    path = tmp_path / "out.jsonl"
+    good = json.dumps({"id": "a", "status": "ok"}) + "\n" + json.dumps({"id": "b", "status": "ok"}) + "\n"
+    path.write_text(good + '{"id": "c", "status": "ok", "itin')
+
+    assert batch.truncate_torn_tail(str(path), block_size=8) == len('{"id": "c", "status": "ok", "itin')
+    assert path.read_text() == good
+    assert [json.loads(line)["id"] for line in path.read_text().splitlines()] == ["a", "b"]
+    assert batch.completed_ids(str(path)) == {"a", "b"}
+
+
+def test_complete_or_missing_files_are_left_alone(tmp_path):
+    path = tmp_path / "out.jsonl"
+    assert batch.truncate_torn_tail(str(path)) == 0
+    assert not path.exists()
+
+    path.write_text('{"id": "a"}\n')
+    assert batch.truncate_torn_tail(str(path)) == 0
+    assert path.read_text() == '{"id": "a"}\n'
+
+    path.write_text('{"id": "a", "sta')  # crashed during the very first record
+    assert batch.truncate_torn_tail(str(path)) == len('{"id": "a", "sta')
+    assert path.read_text() == ""
+
+
+def test_long_trips_are_generated_a_day_per_call(monkeypatch, tmp_path):
+    calls = {"outline": 0, "days": [], "single": 0}
+
+    class Client:
+        """Async Cohere client stand-in; billed units are fixed per kind of call"""
+
+        async def chat(self, message, max_tokens, **kwargs):
+            day = re.search(r"Write only Day (\d+)", message)
+            if "Day 1 to Day" in message:
+                calls["outline"] += 1
+                text, units = "\n".join(f"Day {n}: Theme {n}" for n in range(1, 9)), (50, 40)
+            elif day is None:
+                calls["single"] += 1
+                text, units = "truncated whole trip", (50, 1000)
+            else:
+                calls["days"].append(int(day.group(1)))
+                text, units = f"**Day {day.group(1)}: Theme {day.group(1)}**\n- Plan", (60, 100)
+            billed = SimpleNamespace(input_tokens=units[0], output_tokens=units[1])
+            return SimpleNamespace(text=text, meta=SimpleNamespace(billed_units=billed))
+
+    monkeypatch.setattr(ai_itinerary, "get_client", Client)
+    trips = tmp_path / "trips.jsonl"
+    trips.write_text(json.dumps({"id": "long", "origin": "London", "destination": "Rome", "trip_length": 8,
+                                 "start_date": "2026-05-01", "end_date": "2026-05-09", "budget": "medium",
+                                 "activities": [], "transportation": "public"}) + "\n")
+    out = tmp_path / "out.jsonl"
+
+    totals = batch.run_batch(str(trips), str(out))
+
+    assert calls["outline"] == 1 and calls["single"] == 0
+    assert sorted(calls["days"]) == list(range(1, 9))
+    record = json.loads(out.read_text())
+    assert record["status"] == "ok"
+    assert all(f"**Day {n}: Theme {n}**" in record["itinerary"] for n in range(1, 9))
+    assert record["usage"] == {"input_tokens": 50 + 8 * 60, "output_tokens": 40 + 8 * 100}
+    assert totals["ok"] == 1
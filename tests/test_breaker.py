@@ -0,0 +1,75 @@
+# test_breaker.py
+import time
+
+import planner
+import scraper
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_opens_on_failure_rate_then_half_opens_and_closes():
+    breaker = CircuitBreaker("test", window=4, min_calls=4, failure_rate=0.5, cooldown=0.05)
+    for ok in (True, False, True):
+        assert breaker.allow()
+        breaker.record(ok, 0.1, None if ok else "boom")
+    assert breaker.state == CLOSED  # fewer than min_calls so far
+    breaker.record(False, 0.1, "boom")
+    assert breaker.state == OPEN
+    assert breaker.last_error == "boom"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # the one trial call
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.health()["calls"] == 0
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, cooldown=0.05)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False, 0.1, "still down")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", window=4, min_calls=4, failure_rate=0.5, slow_call=1.0)
+    breaker.record(True, 0.2)
+    breaker.record(True, 0.3)
+    breaker.record(True, 2.5)
+    assert breaker.state == CLOSED
+    breaker.record(True, 1.5)
+    assert breaker.state == OPEN
+    assert breaker.last_error == "slow call (1.5s)"
+    assert breaker.health()["failure_rate"] == 0.5
+
+
+def test_hotel_pages_that_all_failed_count_as_a_failure(monkeypatch):
+    breaker = CircuitBreaker("hotels", window=2, min_calls=2)
+    monkeypatch.setattr(planner, "hotel_breaker", breaker)
+    errors = [{"name": "Error", "description": "connection refused", "url": f"https://h/{i}"} for i in range(3)]
+    monkeypatch.setattr(scraper, "scrape_hotels", lambda *args: errors)
+
+    for _ in range(2):
+        hotels = planner.safe_scrape_hotels("Paris", "2026-05-01", "2026-05-04")
+        assert all(hotel["name"] != "Error" for hotel in hotels)
+        assert hotels == planner.fallback_hotels("Paris", "2026-05-01", "2026-05-04")
+    assert breaker.state == OPEN
+    assert breaker.last_error == "connection refused"
+
+
+def test_error_records_are_dropped_from_a_partial_result(monkeypatch):
+    breaker = CircuitBreaker("hotels")
+    monkeypatch.setattr(planner, "hotel_breaker", breaker)
+    good = {"name": "Le Marais Suites", "description": "Quiet", "url": "https://h/1"}
+    monkeypatch.setattr(scraper, "scrape_hotels",
+                        lambda *args: [good, {"name": "Error", "description": "timeout", "url": "https://h/2"}])
+
+    assert planner.safe_scrape_hotels("Paris", "2026-05-01", "2026-05-04") == [good]
+    assert breaker.health()["failure_rate"] == 0.0
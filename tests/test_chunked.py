@@ -0,0 +1,64 @@
+# test_chunked.py
+import datetime
+import re
+
+import pytest
+
+import ai_itinerary
+from ai_itinerary import ItineraryRateLimited
+
+
+def _trip(days):
+    start = datetime.date(2025, 6, 1)
+    return {"origin": "", "destination": "Paris", "trip_length": days, "start_date": start,
+            "end_date": start + datetime.timedelta(days=days), "budget": "medium", "activities": [],
+            "transportation": "public"}
+
+
+@pytest.fixture
+def cohere(monkeypatch):
+    """Stubbed calls: the outline names each day, day calls fail for the day numbers in `failing`"""
+    calls = {"single": 0, "days": 0, "failing": set()}
+
+    def chat(prompt, model=None, max_tokens=None):
+        if prompt.template == "outline":
+            days = int(re.search(r"Day 1 to Day (\d+)", prompt.message).group(1))
+            return "Intro: Bonjour.\n" + "\n".join(f"Day {n}: Theme {n}" for n in range(1, days + 1))
+        calls["single"] += 1
+        return "whole trip"
+
+    async def chat_async(prompt, model=None, max_tokens=None):
+        calls["days"] += 1
+        day = int(re.search(r"Write only Day (\d+)", prompt.message).group(1))
+        if day in calls["failing"]:
+            raise ItineraryRateLimited("throttled")
+        return f"**Day {day}: Theme {day}**\n- Plan for day {day}"
+
+    monkeypatch.setattr(ai_itinerary, "_chat", chat)
+    monkeypatch.setattr(ai_itinerary, "_chat_async", chat_async)
+    return calls
+
+
+def test_a_default_length_trip_is_one_call(cohere):
+    assert ai_itinerary.generate_itinerary_cached(_trip(5), bypass=True) == "whole trip"
+    assert cohere == {"single": 1, "days": 0, "failing": set()}
+
+
+def test_a_failed_day_falls_back_to_its_theme(cohere):
+    cohere["failing"] = {3}
+    data = _trip(8)
+
+    text = ai_itinerary.generate_itinerary_cached(data, bypass=True)
+
+    assert "- Plan for day 2" in text and "- Plan for day 4" in text
+    assert "**Day 3: Theme 3**" in text and "- Plan for day 3" not in text
+    assert cohere["days"] == 8  # the other days were kept, not regenerated
+    # Incomplete itineraries are not cached
+    assert not ai_itinerary.itinerary_cache.contains(ai_itinerary.itinerary_cache_key(data))
+
+
+def test_the_trip_fails_only_when_every_day_failed(cohere):
+    cohere["failing"] = set(range(1, 8))
+
+    with pytest.raises(ItineraryRateLimited):
+        ai_itinerary.generate_itinerary_cached(_trip(7), bypass=True)
@@ -0,0 +1,71 @@
+# test_date_shift.py
+import datetime
+
+import ai_itinerary
+from ai_itinerary import shift_dates
+from itinerary import Day, Itinerary, parse_itinerary
+
+JUNE_1 = datetime.date(2025, 6, 1)
+
+
+def _trip(destination, start, days=3):
+    return {"origin": "", "destination": destination, "trip_length": days, "start_date": start,
+            "end_date": start + datetime.timedelta(days=days), "budget": "medium", "activities": [],
+            "transportation": "public"}
+
+
+def test_day_numbers_are_not_mistaken_for_dates():
+    text = "**Day 1 June 1 - Arrival**\n**Day 2 June 2 - Louvre**\nBook by 1 June."
+    assert shift_dates(text, JUNE_1, datetime.date(2025, 6, 11), 2) == (
+        "**Day 1 June 11 - Arrival**\n**Day 2 June 12 - Louvre**\nBook by 11 June.")
+    assert shift_dates("DAY 2 Jun: Louvre", JUNE_1, datetime.date(2025, 6, 11), 2) == "DAY 2 Jun: Louvre"
+
+
+def test_every_spelling_moves_across_a_month_boundary():
+    text = ("Saturday, June 28, 2025: arrive. Day 2 (Sun, Jun 29) Louvre. "
+            "Day 3: 30 June, market. Check out 2025-07-01 or 7/1/2025.")
+    assert shift_dates(text, datetime.date(2025, 6, 28), datetime.date(2025, 7, 3), 3) == (
+        "Thursday, July 3, 2025: arrive. Day 2 (Fri, Jul 4) Louvre. "
+        "Day 3: 5 July, market. Check out 2025-07-06 or 7/6/2025.")
+
+
+def test_overlapping_ranges_are_rewritten_once():
+    # June 3 is both an old date (day 3) and a new one (day 1); it must become June 5, not June 7
+    text = "June 1 arrive, June 3 museum, June 4 leave"
+    assert shift_dates(text, JUNE_1, datetime.date(2025, 6, 3), 3) == "June 3 arrive, June 5 museum, June 6 leave"
+
+
+def test_other_numbers_and_dates_are_left_alone():
+    text = "Day 1: 10 June is outside the trip; June 15 too. Room 6/1/20251."
+    assert shift_dates(text, JUNE_1, datetime.date(2025, 6, 11), 3) == text
+
+
+def test_a_shifted_hit_is_served_with_the_new_dates_and_promoted():
+    stored = _trip("Shiftville", JUNE_1)
+    ai_itinerary.store_itinerary(stored, "**Day 1 June 1: Arrival**\n**Day 2 June 2: Old town**")
+    later = _trip("Shiftville", datetime.date(2025, 6, 11))
+    key = ai_itinerary.itinerary_cache_key(later)
+
+    text = ai_itinerary._cached_itinerary(later, ai_itinerary.DEFAULT_MODEL, key)
+
+    assert text == "**Day 1 June 11: Arrival**\n**Day 2 June 12: Old town**"
+    assert ai_itinerary.itinerary_cache.get(key) == text
+
+
+def test_structured_itineraries_only_have_their_text_shifted():
+    stored = Itinerary("Arrive June 1.", [
+        Day(1, "Day 1 June 1 - Arrival", "Louvre on June 1", "Bistro", "Book by 1 June"),
+        Day(2, "Old town", "Walk on Monday, June 2", "Market", ""),
+    ]).to_json()
+
+    text = ai_itinerary.shift_itinerary(stored, JUNE_1, datetime.date(2025, 6, 11), 2)
+
+    itinerary = parse_itinerary(text, 2)
+    assert itinerary.structured
+    assert itinerary.intro == "Arrive June 11."
+    assert itinerary.days[0] == Day(1, "Day 1 June 11 - Arrival", "Louvre on June 11", "Bistro", "Book by 11 June")
+    assert itinerary.days[1] == Day(2, "Old town", "Walk on Thursday, June 12", "Market", "")
+
+
+def test_markdown_is_shifted_as_text():
+    assert ai_itinerary.shift_itinerary("Arrive June 1.", JUNE_1, datetime.date(2025, 6, 11), 2) == "Arrive June 11."
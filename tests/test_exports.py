@@ -0,0 +1,38 @@
+# test_exports.py
+import exports
+
+PAYLOAD = {
+    "trip": {"destination": "Lisbon", "start_date": "2026-05-01", "end_date": "2026-05-03", "activities": []},
+    "itinerary": "Two days by the river.\n\n**Day 1: Alfama**\nCastle walk.\n\n**Day 2: Belem**\nTower and pastries.",
+    "flights": [{"airline": "TAP", "flight_number": "TP1", "origin": "LHR", "destination": "LIS",
+                 "departure_time": "09:15", "arrival_time": "11:45", "duration": "2h 30m", "price": "120"}],
+    "hotels": [],
+    "car_rentals": [],
+}
+
+
+def _counters():
+    stats = exports.export_cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_polling_does_not_read_the_cache():
+    key = exports.export_key("ics", PAYLOAD)
+    before = _counters()
+    for _ in range(5):
+        assert exports.export_status(key) == ("missing", None)
+    assert _counters() == before
+
+    exports.request_export("ics", PAYLOAD)
+    exports._jobs[key].result(timeout=10)
+    for _ in range(5):
+        assert exports.export_status(key) == ("ready", None)
+    assert _counters() == before
+
+    data = exports.export_file(key)
+    assert _counters() == (before[0] + 1, before[1])
+    text = data.decode("utf-8")
+    assert "SUMMARY:Lisbon day 2: Belem" in text
+    # 2h 30m flight from 09:15
+    assert "DTSTART:20260501T091500" in text and "DTEND:20260501T114500" in text
+    assert "$120" in text
@@ -0,0 +1,43 @@
+# test_gazetteer.py
+import os
+
+import gazetteer
+
+
+def _row(geonameid, name, population, lat=10.0, lon=20.0, country="XX", tz="Etc/UTC"):
+    cols = [str(geonameid), name, name, "", str(lat), str(lon), "P", "PPL", country, "", "", "", "", "",
+            str(population), "", "", tz, "2024-01-01"]
+    return "\t".join(cols) + "\n"
+
+
+def _build(tmp_path, rows):
+    source = tmp_path / "cities.tsv"
+    source.write_text("".join(rows), encoding="utf-8")
+    index = tmp_path / "gazetteer.idx"
+    gazetteer.build_index(str(source), str(index))
+    return gazetteer.Gazetteer(str(index))
+
+
+def test_busy_prefix_finds_the_largest_cities(tmp_path):
+    # Thousands of small "San A..." towns sort before the big cities
+    rows = [_row(i, f"San Agustin {i:04d}", 1000 + i) for i in range(3000)]
+    rows += [_row(9001, "San Salvador", 570_000), _row(9002, "Santiago", 6_000_000),
+             _row(9003, "San Diego", 1_400_000), _row(9004, "Sapporo", 1_900_000)]
+    index = _build(tmp_path, rows)
+
+    assert [city.name for city in index.search("san", 3)] == ["Santiago", "San Diego", "San Salvador"]
+    assert [city.name for city in index.search("SAN D", 5)] == ["San Diego"]
+    assert index.search("zzz") == []
+
+
+def test_lookup_prefers_the_most_populous_namesake(tmp_path):
+    index = _build(tmp_path, [_row(1, "Córdoba", 300_000, country="ES"), _row(2, "Cordoba", 1_400_000, country="AR")])
+
+    assert index.lookup("cordoba").country == "AR"
+    assert index.lookup("  CÓRDOBA ").country == "AR"
+    assert index.lookup("Lisbon") is None
+
+
+def test_default_index_lives_next_to_the_code():
+    assert os.path.dirname(os.path.dirname(gazetteer.GAZETTEER_INDEX)) == os.path.dirname(
+        os.path.abspath(gazetteer.__file__))
@@ -0,0 +1,47 @@
+# test_itinerary.py
+import json
+
+import ai_itinerary
+from itinerary import parse_itinerary
+
+
+def _reply(numbers, intro="Welcome."):
+    return json.dumps({"intro": intro, "days": [
+        {"day": n, "theme": f"Theme {n}", "attraction": f"Sight {n}", "food": "Bistro", "tip": "Go early"}
+        for n in numbers]})
+
+
+def test_complete_reply_is_structured():
+    itinerary = parse_itinerary(_reply([1, 2, 3]), 3)
+
+    assert itinerary.structured
+    assert [day.number for day in itinerary.days] == [1, 2, 3]
+    assert parse_itinerary(itinerary.to_json(), 3).structured
+
+
+def test_short_reply_falls_back_to_readable_markdown():
+    itinerary = parse_itinerary(_reply([1, 2]), 4)
+
+    assert not itinerary.structured
+    assert "**Day 2: Theme 2**" in itinerary.markdown and "{" not in itinerary.markdown
+
+
+def test_day_numbers_must_follow_the_order():
+    assert not parse_itinerary(_reply([1, 3, 4]), 3).structured
+    assert not parse_itinerary(_reply([2, 1]), 2).structured
+    assert parse_itinerary(_reply(["1", "2"]), 2).structured
+
+
+def test_unstructured_reply_is_kept_as_is():
+    assert parse_itinerary("**Day 1: Arrival**").markdown == "**Day 1: Arrival**"
+
+
+def test_finalize_checks_the_count_against_the_trip(monkeypatch):
+    monkeypatch.setattr(ai_itinerary, "STRUCTURED", True)
+
+    stored = ai_itinerary.finalize_itinerary(_reply([1, 2]), {"trip_length": 2})
+    assert parse_itinerary(stored).structured
+
+    stored = ai_itinerary.finalize_itinerary(_reply([1, 2]), {"trip_length": 5})
+    assert not parse_itinerary(stored).structured
+    assert stored.startswith("Welcome.")
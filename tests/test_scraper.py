@@ -0,0 +1,178 @@
+# test_scraper.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import scraper
+
+
+class StandIn(ThreadingHTTPServer):
+    """Local hotel site: every request waits `latency` seconds (or ?delay=) and is counted"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.release = threading.Event()  # set on teardown so slow requests finish at once
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.served = 0
+        self.clients = set()  # client (host, port) pairs, i.e. distinct connections
+
+    @property
+    def base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        delay = float(query["delay"][0]) if "delay" in query else server.latency
+        with server.lock:
+            server.active += 1
+            server.clients.add(self.client_address)
+            server.peak = max(server.peak, server.active)
+        try:
+            server.release.wait(delay)
+            if "cache" in query and self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            body = f"<html><head><title>{self.path}</title></head><body></body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if "cache" in query:
+                # Stale at once, so the next lookup is a stale hit revalidated in the background
+                self.send_header("ETag", '"v1"')
+                self.send_header("Cache-Control", "max-age=0, stale-while-revalidate=600")
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+                server.served += 1
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def start(latency=0.0):
+        server = StandIn(latency)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.release.set()
+    # Let cancelled-but-running fetches drain so the shared pool is idle for the next test
+    scraper._fetch_pool.submit(lambda: None).result(timeout=5)
+    time.sleep(0.1)
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _get(url):
+    res = scraper.get_session().get(url, timeout=5)
+    res.raise_for_status()
+    return res.text
+
+
+def test_concurrency_is_bounded_by_the_pool(stand_in):
+    servers = [stand_in(latency=0.2) for _ in range(4)]
+    urls = [f"{server.base}/hotel/{i}" for server in servers for i in range(scraper.PER_HOST_CONNECTIONS)]
+    peak = 0
+    lock = threading.Lock()
+    active = [0]
+
+    def fetch(url):
+        with lock:
+            active[0] += 1
+            nonlocal peak
+            peak = max(peak, active[0])
+        try:
+            return _get(url)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    started = time.monotonic()
+    pages = scraper.fetch_all(fetch, urls, deadline=10)
+    elapsed = time.monotonic() - started
+
+    assert len(pages) == len(urls)
+    assert peak <= scraper.FETCH_WORKERS
+    assert sum(server.peak for server in servers) > scraper.PER_HOST_CONNECTIONS  # hosts fetched in parallel
+    # 16 requests of 0.2s on 8 workers: two waves, not sixteen
+    assert elapsed < 0.2 * len(urls) / 2
+
+
+def test_connections_per_host_are_capped(stand_in):
+    server = stand_in(latency=0.2)
+    urls = [f"{server.base}/hotel/{i}" for i in range(scraper.FETCH_WORKERS * 2)]
+
+    pages = scraper.fetch_all(_get, urls, deadline=10)
+
+    assert len(pages) == len(urls)
+    assert server.peak == scraper.PER_HOST_CONNECTIONS
+
+
+def test_deadline_returns_only_finished_pages(stand_in):
+    server = stand_in()
+    fast = [f"{server.base}/fast/{i}?delay=0.05" for i in range(3)]
+    slow = [f"{server.base}/slow/{i}?delay=5" for i in range(2)]
+
+    started = time.monotonic()
+    pages = scraper.fetch_all(_get, slow[:1] + fast + slow[1:], deadline=1.0)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2.0
+    assert [page for page in pages if "/slow/" in page] == []
+    # Finished pages come back in input order
+    assert [page.split("<title>")[1].split("</title>")[0] for page in pages] == [
+        urlparse(url).path + "?" + urlparse(url).query for url in fast]
+
+
+def test_session_is_shared_and_keeps_connections_alive(stand_in):
+    server = stand_in()
+    assert scraper.get_session() is scraper.get_session()
+
+    for i in range(5):
+        _get(f"{server.base}/hotel/{i}")
+
+    assert server.served == 5
+    assert len(server.clients) == 1
+
+
+def test_background_revalidation_does_not_count_bytes_twice(stand_in):
+    server = stand_in()
+    url = f"{server.base}/hotel/cached?cache=1"
+    scraper.page_cache.delete(url)
+    size = len(_get(url).encode())
+    before = scraper.cache_stats()
+
+    scraper.scrape_hotel_details(url)  # miss: fetched and stored
+    scraper.scrape_hotel_details(url)  # stale hit, revalidated in the background (304)
+    deadline = time.monotonic() + 5
+    while scraper._revalidating and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    after = scraper.cache_stats()
+    assert after["stale_hits"] - before["stale_hits"] == 1
+    assert after["not_modified"] == before["not_modified"]
+    assert after["bytes_saved"] - before["bytes_saved"] == size
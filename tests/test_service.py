@@ -0,0 +1,72 @@
+# test_service.py
+import threading
+
+import pytest
+import requests
+
+import planner
+import service
+from ai_itinerary import ItineraryRateLimited, ItineraryUnavailable
+from planner_client import RemotePlanner
+
+FORM = {"origin": "Lisbon", "destination": "Paris", "trip_length": 3, "start_date": "2025-06-01",
+        "end_date": "2025-06-04", "budget": "medium", "activities": [], "transportation": "public"}
+
+
+@pytest.fixture
+def failing_itinerary(monkeypatch):
+    """Make the itinerary source raise the given error; other sources use simulated data"""
+    monkeypatch.setattr(planner, "safe_scrape_hotels", lambda *args, **kwargs: planner.fallback_hotels(*args[:3]))
+    monkeypatch.setattr(planner, "record_trip", lambda data: None)
+
+    def fail_with(error):
+        def generate(data):
+            raise error
+        monkeypatch.setattr(planner, "generate_itinerary_cached", generate)
+
+    return fail_with
+
+
+@pytest.fixture
+def base_url():
+    server = service.ThreadingHTTPServer(("127.0.0.1", 0), service.PlannerHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_itinerary_is_empty_not_an_error_sentence(failing_itinerary):
+    failing_itinerary(ItineraryUnavailable("cohere is down"))
+
+    plan = planner.plan_trip(FORM)
+
+    assert plan["itinerary"] == ""
+    assert any("cohere is down" in warning for warning in plan["warnings"])
+    assert plan["report"]["itinerary"]["error_type"] == "ItineraryUnavailable"
+    assert plan["hotels"] and plan["flights"]
+
+
+@pytest.mark.parametrize("error, status", [(ItineraryRateLimited("slow down"), 429),
+                                           (ItineraryUnavailable("cohere is down"), 503)])
+def test_plan_endpoint_maps_itinerary_failures_like_the_stream(failing_itinerary, base_url, error, status):
+    failing_itinerary(error)
+
+    res = requests.post(f"{base_url}/v1/plan", json={"form_data": FORM}, timeout=10)
+
+    assert res.status_code == status
+    body = res.json()
+    assert body["itinerary"] == "" and body["error"] == str(error)
+    # The client still hands the rest of the plan to the app, like the in-process engine
+    plan = RemotePlanner(base_url).plan_trip(FORM)
+    assert plan["itinerary"] == "" and plan["hotels"] and plan["warnings"]
+
+
+def test_plan_endpoint_without_itinerary_is_ok(failing_itinerary, base_url):
+    failing_itinerary(AssertionError("itinerary should not be generated"))
+
+    res = requests.post(f"{base_url}/v1/plan", json={"form_data": FORM, "include_itinerary": False}, timeout=10)
+
+    assert res.status_code == 200
+    assert "itinerary" not in res.json()
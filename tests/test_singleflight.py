@@ -0,0 +1,111 @@
+# test_singleflight.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+FOLLOWERS = 7
+
+
+def _wait_for(flight, followers):
+    deadline = time.monotonic() + 5
+    while flight.stats()["followers"] < followers:
+        assert time.monotonic() < deadline, "followers never joined"
+        time.sleep(0.005)
+
+
+def _leader(flight, key, release, result=None, error=None):
+    """Submit-able call that holds the key until release is set"""
+    def work():
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return lambda: flight.do(key, work, timeout=5)
+
+
+def test_concurrent_callers_share_one_call():
+    flight, release, calls = SingleFlight("test"), threading.Event(), []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"hotels": 3}
+
+    with ThreadPoolExecutor(FOLLOWERS + 1) as pool:
+        leader = pool.submit(flight.do, "paris", work, 5)
+        while not flight.stats()["in_flight"]:
+            time.sleep(0.005)
+        followers = [pool.submit(flight.do, "paris", work, 5) for _ in range(FOLLOWERS)]
+        _wait_for(flight, FOLLOWERS)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"name": "test", "in_flight": 0, "leaders": 1, "followers": FOLLOWERS}
+    # Nothing is remembered once the call is done
+    assert flight.do("paris", lambda: "fresh") == "fresh"
+
+
+def test_other_keys_do_not_wait():
+    flight, release = SingleFlight("test"), threading.Event()
+    with ThreadPoolExecutor(2) as pool:
+        held = pool.submit(_leader(flight, "paris", release, "paris"))
+        while not flight.stats()["in_flight"]:
+            time.sleep(0.005)
+        assert flight.do("tokyo", lambda: "tokyo") == "tokyo"
+        release.set()
+        assert held.result() == "paris"
+
+
+def test_leader_exception_reaches_every_follower():
+    flight, release = SingleFlight("test"), threading.Event()
+    error = ConnectionError("source down")
+    with ThreadPoolExecutor(FOLLOWERS + 1) as pool:
+        leader = pool.submit(_leader(flight, "paris", release, error=error))
+        while not flight.stats()["in_flight"]:
+            time.sleep(0.005)
+        followers = [pool.submit(flight.do, "paris", lambda: "not called", 5) for _ in range(FOLLOWERS)]
+        _wait_for(flight, FOLLOWERS)
+        release.set()
+        for future in [leader] + followers:
+            with pytest.raises(ConnectionError) as raised:
+                future.result()
+            assert raised.value is error
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_follower_times_out_while_the_leader_keeps_going():
+    flight, release = SingleFlight("test"), threading.Event()
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(_leader(flight, "paris", release, "done"))
+        while not flight.stats()["in_flight"]:
+            time.sleep(0.005)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError, match="test: timed out"):
+            flight.do("paris", lambda: "not called", timeout=0.1)
+        assert time.monotonic() - started < 1
+        release.set()
+        assert leader.result() == "done"
+
+
+def test_stream_followers_get_every_chunk():
+    flight, release = SingleFlight("test"), threading.Event()
+
+    def chunks():
+        yield "Day 1"
+        release.wait(5)
+        yield ", Day 2"
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(lambda: "".join(flight.stream("trip", chunks, timeout=5)))
+        while not flight.stats()["in_flight"]:
+            time.sleep(0.005)
+        follower = pool.submit(lambda: "".join(flight.stream("trip", lambda: iter(["not called"]), timeout=5)))
+        _wait_for(flight, 1)
+        release.set()
+        assert leader.result() == follower.result() == "Day 1, Day 2"
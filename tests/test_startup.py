@@ -0,0 +1,26 @@
+# test_startup.py
+import sys
+import threading
+import time
+
+import startup
+
+
+def test_concurrent_lazy_import_waits_for_a_slow_import(tmp_path, monkeypatch):
+    (tmp_path / "slow_engine.py").write_text("import time\ntime.sleep(0.5)\nREADY = True\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "slow_engine", raising=False)
+    seen = {}
+
+    def first():
+        seen["first"] = startup.lazy_import("slow_engine").READY
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    while "slow_engine" not in sys.modules:  # the first import is under way
+        time.sleep(0.001)
+    seen["second"] = getattr(startup.lazy_import("slow_engine"), "READY", None)
+    thread.join()
+
+    assert seen == {"first": True, "second": True}
+    assert [entry["module"] for entry in startup.import_report()].count("slow_engine") == 1
@@ -0,0 +1,80 @@
+# test_warmup.py
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import ai_itinerary
+import warmup
+from ratelimit import BackgroundLimiter, RateLimiter
+
+
+def _trip(**changes):
+    trip = {"origin": "Lisbon", "destination": "Paris", "trip_length": 4, "start_date": datetime.date(2025, 6, 1),
+            "end_date": datetime.date(2025, 6, 5), "budget": "medium", "activities": ["food"],
+            "transportation": "public"}
+    trip.update(changes)
+    return trip
+
+
+@pytest.fixture(autouse=True)
+def empty_demand():
+    warmup.demand.clear()
+
+
+def test_origin_does_not_change_the_itinerary_key():
+    assert ai_itinerary.itinerary_cache_key(_trip()) == ai_itinerary.itinerary_cache_key(_trip(origin="Berlin"))
+    assert "Lisbon" not in ai_itinerary.generate_itinerary_prompt(_trip()).message
+
+
+def test_most_requested_trips_are_warmed_first():
+    for _ in range(3):
+        warmup.record_trip(_trip(activities=["museums", "food"]))
+    warmup.record_trip(_trip(destination="Tokyo", origin="Osaka"))
+    warmup.record_trip(_trip(destination=" paris ", activities=["Food", "museums"]))  # same trip as above
+
+    trips = warmup.warmup_trips(start_date=datetime.date(2025, 7, 1))
+
+    assert [(t["destination"].strip().casefold(), t["activities"]) for t in trips[:2]] == [
+        ("paris", ["food", "museums"]), ("tokyo", ["food"])]
+    assert trips[0]["start_date"] == datetime.date(2025, 7, 1)
+    assert trips[0]["end_date"] == datetime.date(2025, 7, 5)
+    # Curated combinations follow, without duplicates
+    keys = [warmup._demand_key(warmup._combination(t)) for t in trips]
+    assert len(keys) == len(set(keys))
+    assert len(trips) == 2 + len(warmup.WARMUP_TRIP_LENGTHS) * len(warmup.WARMUP_DESTINATIONS) * len(
+        warmup.WARMUP_BUDGETS) * len(warmup.WARMUP_TRANSPORTS)
+
+
+def test_background_work_only_uses_spare_shared_capacity():
+    shared = RateLimiter(requests_per_minute=8)
+    background = BackgroundLimiter(shared, requests_per_minute=60, headroom=2)
+    far = float("inf")
+
+    assert background._try_shared(0, far) == 0  # idle: 8 left
+    for _ in range(5):
+        shared.acquire(max_wait=0)
+    assert background._try_shared(0, far) > 0  # 2 left, all kept for live callers
+    assert shared.stats()["granted"] == 6
+
+    shared.waiting = 1  # a live caller is queued
+    shared.requests.give(8)
+    assert background._try_shared(0, far) > 0
+
+
+def test_background_budget_follows_calls_onto_the_event_loop(monkeypatch):
+    seen = []
+
+    class Client:
+        async def chat(self, **kwargs):
+            seen.append(ai_itinerary._limiter.get())
+            return SimpleNamespace(text="ok", meta=None)
+
+    monkeypatch.setattr(ai_itinerary, "get_client", Client)
+
+    ai_itinerary.chat_with_usage("live")
+    with ai_itinerary.background_budget():
+        ai_itinerary.chat_with_usage("warm")
+    ai_itinerary.chat_with_usage("live again")
+
+    assert seen == [ai_itinerary.cohere_limiter, ai_itinerary.background_limiter, ai_itinerary.cohere_limiter]
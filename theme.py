@@ -0,0 +1,381 @@
+# theme.py
+import json
+
+import streamlit as st
+
+from startup import lazy_import
+
+# Enhanced CSS with modern UI elements
+CSS = """
+        /* Main container styling */
+        .main {
+            padding: 2rem;
+            background-color: #1e1e1e;
+            color: #f5f5f5;
+            transition: all 0.3s ease;
+        }
+        
+        /* Typography */
+        h1 {
+            font-weight: 900;
+            margin-bottom: 2rem;
+            color: #FF4081;  /* Savage pink */
+            font-size: 3rem;
+            letter-spacing: -1px;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
+        }
+        
+        h2 {
+            font-weight: 700;
+            margin-bottom: 1rem;
+            color: #FF4081;
+        }
+        
+        h3 {
+            font-weight: 600;
+            margin-bottom: 0.8rem;
+            color: #FF4081;
+        }
+        
+        /* Card design with glassmorphism */
+        .card {
+            background-color: rgba(44, 47, 56, 0.8);
+            border-radius: 16px;
+            padding: 1.5rem;
+            margin-bottom: 1.5rem;
+            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
+            backdrop-filter: blur(12px);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            transition: transform 0.3s, box-shadow 0.3s;
+        }
+        
+        .card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 12px 32px rgba(255, 64, 129, 0.2);
+        }
+        
+        /* Travel item cards */
+        .travel-item {
+            background-color: rgba(44, 47, 56, 0.5);
+            border-radius: 12px;
+            padding: 16px;
+            margin-bottom: 16px;
+            border-left: 4px solid #FF4081;
+            transition: all 0.2s ease;
+        }
+        
+        .travel-item:hover {
+            background-color: rgba(44, 47, 56, 0.7);
+            transform: translateX(5px);
+        }
+        
+        /* Shared parts of the flight, hotel and car cards (cards.py) */
+        .card-row {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }
+        
+        .card-section {
+            margin-top: 12px;
+        }
+        
+        .card-title {
+            font-size: 18px;
+            font-weight: bold;
+            color: #FF4081;
+        }
+        
+        .card-price, .card-time {
+            font-size: 16px;
+            font-weight: bold;
+        }
+        
+        .card-meta {
+            font-size: 14px;
+            opacity: 0.8;
+        }
+        
+        .card-small {
+            font-size: 12px;
+            opacity: 0.8;
+        }
+        
+        .card-body {
+            margin-top: 10px;
+            font-size: 14px;
+        }
+        
+        .card-end {
+            text-align: right;
+        }
+        
+        .card-actions {
+            margin-top: 12px;
+            text-align: right;
+        }
+        
+        .chip {
+            background: rgba(255, 255, 255, 0.1);
+            padding: 4px 8px;
+            border-radius: 4px;
+            font-size: 12px;
+            margin-right: 6px;
+        }
+        
+        .flight-path {
+            display: flex;
+            flex-direction: column;
+            align-items: center;
+        }
+        
+        .flight-line {
+            width: 100px;
+            height: 2px;
+            background: rgba(255, 255, 255, 0.2);
+            position: relative;
+            margin: 8px 0;
+        }
+        
+        .flight-line:before, .flight-line:after {
+            content: '';
+            position: absolute;
+            width: 8px;
+            height: 8px;
+            background: #FF4081;
+            border-radius: 50%;
+            top: -3px;
+        }
+        
+        .flight-line:before {
+            left: 0;
+        }
+        
+        .flight-line:after {
+            right: 0;
+        }
+        
+        .btn-small {
+            font-size: 14px;
+            padding: 6px 12px;
+        }
+        
+        /* Progress indicators */
+        .step-progress {
+            display: flex;
+            justify-content: space-between;
+            margin: 2rem 0;
+            position: relative;
+        }
+        
+        .step-progress:before {
+            content: '';
+            position: absolute;
+            background: #444;
+            height: 4px;
+            width: 100%;
+            top: 50%;
+            transform: translateY(-50%);
+            z-index: 0;
+        }
+        
+        .step {
+            width: 40px;
+            height: 40px;
+            border-radius: 50%;
+            background: #333;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            color: white;
+            font-weight: bold;
+            position: relative;
+            z-index: 1;
+            border: 2px solid #444;
+        }
+        
+        .step.active {
+            background: #FF4081;
+            border-color: #FF4081;
+        }
+        
+        .step.completed {
+            background: #4CAF50;
+            border-color: #4CAF50;
+        }
+        
+        /* Enhanced button styles */
+        .primary-btn {
+            background: linear-gradient(135deg, #FF4081 0%, #C2185B 100%);
+            color: white;
+            padding: 10px 20px;
+            border-radius: 30px;
+            font-weight: bold;
+            border: none;
+            cursor: pointer;
+            box-shadow: 0 4px 10px rgba(255, 64, 129, 0.3);
+            transition: all 0.3s ease;
+        }
+        
+        .primary-btn:hover {
+            transform: translateY(-2px);
+            box-shadow: 0 6px 15px rgba(255, 64, 129, 0.4);
+        }
+        
+        .secondary-btn {
+            background: rgba(255, 255, 255, 0.1);
+            color: white;
+            padding: 10px 20px;
+            border-radius: 30px;
+            font-weight: bold;
+            border: 1px solid rgba(255, 255, 255, 0.2);
+            cursor: pointer;
+            transition: all 0.3s ease;
+        }
+        
+        .secondary-btn:hover {
+            background: rgba(255, 255, 255, 0.2);
+        }
+        
+        /* Destination selection styles */
+        .destination-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
+            gap: 1rem;
+            margin-top: 1.5rem;
+        }
+        
+        .destination-card {
+            background-size: cover;
+            background-position: center;
+            height: 150px;
+            border-radius: 12px;
+            display: flex;
+            align-items: flex-end;
+            padding: 1rem;
+            position: relative;
+            overflow: hidden;
+            cursor: pointer;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+            transition: all 0.3s ease;
+        }
+        
+        .destination-card:before {
+            content: '';
+            position: absolute;
+            bottom: 0;
+            left: 0;
+            right: 0;
+            height: 60%;
+            background: linear-gradient(to top, rgba(0,0,0,0.7), transparent);
+            z-index: 1;
+        }
+        
+        .destination-card:hover {
+            transform: scale(1.05);
+        }
+        
+        .destination-name {
+            color: white;
+            font-weight: bold;
+            position: relative;
+            z-index: 2;
+        }
+        
+        /* Animation keyframes */
+        @keyframes fadeIn {
+            from { opacity: 0; }
+            to { opacity: 1; }
+        }
+        
+        .animate-fade {
+            animation: fadeIn 0.5s ease-in-out;
+        }
+        
+        /* Loading spinner */
+        .loader {
+            border: 5px solid #f3f3f3;
+            border-top: 5px solid #FF4081;
+            border-radius: 50%;
+            width: 50px;
+            height: 50px;
+            animation: spin 1s linear infinite;
+            margin: 20px auto;
+        }
+        
+        @keyframes spin {
+            0% { transform: rotate(0deg); }
+            100% { transform: rotate(360deg); }
+        }
+        
+        /* Custom selectbox styling */
+        div[data-baseweb="select"] {
+            background-color: rgba(44, 47, 56, 0.8) !important;
+            border-radius: 10px !important;
+            border: 1px solid rgba(255, 255, 255, 0.1) !important;
+        }
+        
+        /* Tab styling */
+        .stTabs [data-baseweb="tab-list"] {
+            gap: 10px;
+        }
+        
+        .stTabs [data-baseweb="tab"] {
+            background-color: rgba(44, 47, 56, 0.7);
+            border-radius: 10px 10px 0 0;
+            border: none !important;
+            padding: 10px 20px;
+        }
+        
+        .stTabs [aria-selected="true"] {
+            background-color: rgba(255, 64, 129, 0.2) !important;
+            border-bottom: 3px solid #FF4081 !important;
+        }
+        
+        /* Map container */
+        .map-container {
+            border-radius: 12px;
+            overflow: hidden;
+            box-shadow: 0 8px 16px rgba(0,0,0,0.2);
+        }
+        
+        /* Dark scrollbar */
+        ::-webkit-scrollbar {
+            width: 8px;
+            height: 8px;
+        }
+        
+        ::-webkit-scrollbar-track {
+            background: #1e1e1e;
+        }
+        
+        ::-webkit-scrollbar-thumb {
+            background: #444;
+            border-radius: 4px;
+        }
+        
+        ::-webkit-scrollbar-thumb:hover {
+            background: #FF4081;
+        }
+"""
+
+# Appends (or replaces) one <style> tag in the app page's <head>. Component iframes are
+# same-origin with the app, and the tag outlives the iframe, so later reruns need not resend it.
+_INJECTOR = f"""<script>
+const doc = window.parent.document;
+let style = doc.getElementById("travelbuddy-theme");
+if (!style) {{
+    style = doc.createElement("style");
+    style.id = "travelbuddy-theme";
+    doc.head.appendChild(style);
+}}
+style.textContent = {json.dumps(CSS)};
+</script>"""
+
+
+def inject_theme():
+    """Add the global stylesheet to the page once per browser session"""
+    if st.session_state.get("theme_injected"):
+        return
+    lazy_import("streamlit.components.v1").html(_INJECTOR, height=0)
+    st.session_state.theme_injected = True
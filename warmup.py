@@ -0,0 +1,208 @@
+# warmup.py
+import datetime
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import DiskCache, make_key
+
+logger = logging.getLogger(__name__)
+
+# Destinations offered in step 1 of the wizard
+CURATED_DESTINATIONS = ["Paris", "Tokyo", "New York", "Dubai"]
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    return [v.strip() for v in value.split(",") if v.strip()] if value else default
+
+
+WARMUP_DESTINATIONS = _env_list("WARMUP_DESTINATIONS", CURATED_DESTINATIONS)
+WARMUP_BUDGETS = _env_list("WARMUP_BUDGETS", ["budget", "medium", "luxury"])
+WARMUP_TRIP_LENGTHS = [int(v) for v in _env_list("WARMUP_TRIP_LENGTHS", ["5", "3", "7"])]
+WARMUP_TRANSPORTS = _env_list("WARMUP_TRANSPORTS", ["public", "rental car", "taxi"])
+# The most-requested trips of the last WARMUP_DEMAND_TTL seconds are warmed before the curated grid
+WARMUP_POPULAR = int(os.getenv("WARMUP_POPULAR", 20))
+WARMUP_DEMAND_TTL = int(os.getenv("WARMUP_DEMAND_TTL", 30 * 24 * 3600))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 2))
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", 0))  # seconds between runs; 0 runs once
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "").lower() in ("1", "true", "yes")
+
+_status_lock = threading.Lock()
+_status = {
+    "running": False,
+    "runs": 0,
+    "total": 0,
+    "done": 0,
+    "skipped": 0,
+    "failed": 0,
+    "hotels_warmed": 0,
+    "started_at": None,
+    "finished_at": None,
+    "last_error": None,
+}
+_background = None
+
+# Submitted trips (without dates or origin) and how often each was asked for
+demand = DiskCache("warmup_demand", ttl=WARMUP_DEMAND_TTL, max_entries=1000)
+
+
+def status():
+    """Progress of the current (or last) warm-up run"""
+    with _status_lock:
+        return dict(_status)
+
+
+def _update(**changes):
+    with _status_lock:
+        for name, value in changes.items():
+            _status[name] = value
+
+
+def _bump(name):
+    with _status_lock:
+        _status[name] += 1
+
+
+def _combination(data):
+    """The parts of a trip the itinerary depends on, apart from its dates"""
+    return {
+        "destination": str(data["destination"]).strip(),
+        "trip_length": int(data["trip_length"]),
+        "budget": str(data["budget"]).strip().lower(),
+        "transportation": str(data["transportation"]).strip().lower(),
+        "activities": sorted({a.strip().lower() for a in data.get("activities") or []}),
+    }
+
+
+def _demand_key(combination):
+    return make_key("demand", dict(combination, destination=combination["destination"].casefold()))
+
+
+def record_trip(data):
+    """Count a submitted trip, so warm-up precomputes what users actually ask for"""
+    try:
+        combination = _combination(data)
+        key = _demand_key(combination)
+        count = (demand.get(key) or {}).get("count", 0)
+        demand.set(key, {"trip": combination, "count": count + 1})
+    except Exception as e:
+        logger.info("could not record trip demand: %s", e)
+
+
+def popular_trips(limit=WARMUP_POPULAR):
+    """The most-requested trip combinations, most popular first"""
+    entries = sorted(demand.values(), key=lambda entry: entry["count"], reverse=True)
+    return [entry["trip"] for entry in entries[:limit]]
+
+
+def warmup_trips(start_date=None):
+    """form_data for the trips to warm: the most-requested ones, then the curated grid.
+
+    Trips start on start_date (today by default) like the wizard's defaults;
+    other dates in the same season are served from the date-shifted tier.
+    """
+    start_date = start_date or datetime.date.today()
+    combinations = popular_trips()
+    for length, destination, budget, transport in itertools.product(
+        WARMUP_TRIP_LENGTHS, WARMUP_DESTINATIONS, WARMUP_BUDGETS, WARMUP_TRANSPORTS
+    ):
+        combinations.append({"destination": destination, "trip_length": length, "budget": budget,
+                             "transportation": transport, "activities": []})
+    trips, seen = [], set()
+    for combination in combinations:
+        key = _demand_key(combination)
+        if key in seen:
+            continue
+        seen.add(key)
+        trips.append(dict(combination, origin="", start_date=start_date,
+                          end_date=start_date + datetime.timedelta(days=combination["trip_length"])))
+    return trips
+
+
+def _warm_trip(data):
+    from ai_itinerary import (ItineraryError, background_budget, generate_itinerary_cached, itinerary_cache,
+                              itinerary_cache_key)
+    key = itinerary_cache_key(data)
+    if itinerary_cache.contains(key):
+        _bump("skipped")
+        return
+    try:
+        # Warm-up only spends Cohere capacity that live users leave unused
+        with background_budget():
+            generate_itinerary_cached(data)
+    except ItineraryError as e:
+        _bump("failed")
+        _update(last_error=f"itinerary for {data['destination']}: {e}")
+        return
+    _bump("done")
+
+
+def _warm_hotels(destination, check_in, check_out):
+    try:
+        from scraper import scrape_hotels
+        if scrape_hotels(destination, check_in, check_out):
+            _bump("hotels_warmed")
+    except Exception as e:
+        _update(last_error=f"hotels for {destination}: {e}")
+
+
+def run_warmup(trips=None, concurrency=WARMUP_CONCURRENCY):
+    """Fill the shared caches for trips with at most `concurrency` calls in flight"""
+    trips = warmup_trips() if trips is None else trips
+    with _status_lock:
+        if _status["running"]:
+            return dict(_status)
+        _status.update(running=True, total=len(trips), done=0, skipped=0, failed=0,
+                       hotels_warmed=0, started_at=time.time(), finished_at=None, last_error=None)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="warmup") as pool:
+            stays = {(t["destination"], t["start_date"], t["end_date"]) for t in trips}
+            for stay in sorted(stays, key=str):
+                pool.submit(_warm_hotels, *stay)
+            for trip in trips:
+                pool.submit(_warm_trip, trip)
+    finally:
+        with _status_lock:
+            _status.update(running=False, finished_at=time.time())
+            _status["runs"] += 1
+    result = status()
+    logger.info("cache warm-up finished: %s", result)
+    return result
+
+
+def _loop(interval):
+    while True:
+        try:
+            run_warmup()
+        except Exception as e:
+            _update(last_error=str(e))
+            logger.exception("cache warm-up failed")
+        if not interval:
+            return
+        time.sleep(interval)
+
+
+def start_background(interval=WARMUP_INTERVAL):
+    """Start warm-up in a daemon thread once per process; repeats every interval seconds if set"""
+    global _background
+    with _status_lock:
+        if _background is not None:
+            return False
+        _background = threading.Thread(target=_loop, args=(interval,), name="warmup", daemon=True)
+    _background.start()
+    return True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    start_background(interval=0)
+    while _background.is_alive():
+        s = status()
+        print(f"warm-up: {s['done'] + s['skipped'] + s['failed']}/{s['total']} trips "
+              f"({s['skipped']} already cached, {s['failed']} failed), {s['hotels_warmed']} hotel lists")
+        _background.join(timeout=5)
+    print(status())